@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+
+class _Waiter:
+    def __init__(self, request_class: str):
+        self.request_class = request_class
+        self.granted = False
+        self.enqueued_at = time.perf_counter()
+        self.event: Optional[threading.Event] = None
+        self.future: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class PriorityGate:
+    """Concurrency limiter that hands freed slots to the most important waiting request
+
+    Each request class has a priority (0 is highest), a bounded wait queue, a
+    queue timeout and an optional cap on how many slots it may hold at once,
+    so low-priority traffic can never take every slot.
+    """
+
+    def __init__(self, max_concurrent: int, classes: Dict[str, Dict[str, Any]]):
+        self.max_concurrent = max_concurrent
+        self.classes = classes
+        self.order = sorted(classes, key=lambda name: classes[name]['priority'])
+        self.active = 0
+        self.active_by_class = {name: 0 for name in classes}
+        self.waiters = {name: deque() for name in classes}
+        self.metrics = {name: {
+            'admitted': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'queue_time_total_ms': 0.0,
+            'queue_time_max_ms': 0.0,
+        } for name in classes}
+        self._lock = threading.Lock()
+
+    def classify(self, path: str) -> str:
+        for name in self.order:
+            if any(path.startswith(prefix) for prefix in self.classes[name].get('paths', [])):
+                return name
+        return settings.ADMISSION_CONTROL['default_class']
+
+    def _has_room(self, name: str) -> bool:
+        return self.active < self.max_concurrent and not self._at_cap(name)
+
+    def _at_cap(self, name: str) -> bool:
+        max_active = self.classes[name].get('max_active')
+        return max_active is not None and self.active_by_class[name] >= max_active
+
+    def _can_admit(self, name: str) -> bool:
+        # Never overtake anyone waiting at the same or a higher priority,
+        # unless that class is only held back by its own cap
+        priority = self.classes[name]['priority']
+        for other in self.order:
+            if self.classes[other]['priority'] > priority:
+                break
+            if self.waiters[other] and (other == name or not self._at_cap(other)):
+                return False
+        return self._has_room(name)
+
+    def _admit(self, name: str, queued_ms: float = 0.0) -> None:
+        self.active += 1
+        self.active_by_class[name] += 1
+        metrics = self.metrics[name]
+        metrics['admitted'] += 1
+        metrics['queue_time_total_ms'] += queued_ms
+        metrics['queue_time_max_ms'] = max(metrics['queue_time_max_ms'], queued_ms)
+
+    def _try_enter(self, name: str) -> Optional[_Waiter]:
+        """Admit immediately (returns None), queue (returns a waiter) or raise if the queue is full"""
+        if self._can_admit(name):
+            self._admit(name)
+            return None
+        if len(self.waiters[name]) >= self.classes[name]['queue_size']:
+            self.metrics[name]['rejected_queue_full'] += 1
+            raise Rejected(name)
+        waiter = _Waiter(name)
+        self.waiters[name].append(waiter)
+        return waiter
+
+    def _give_up(self, waiter: _Waiter) -> bool:
+        """Called when a waiter timed out; returns True if it was granted a slot meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self.waiters[waiter.request_class].remove(waiter)
+            self.metrics[waiter.request_class]['rejected_timeout'] += 1
+            woken = self._grant_waiting()
+        for other in woken:
+            other.wake()
+        return False
+
+    def _grant_waiting(self):
+        """Hand free slots to queued waiters in priority order; caller holds the lock"""
+        woken = []
+        for name in self.order:
+            queue = self.waiters[name]
+            while queue and self._has_room(name):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._admit(name, (time.perf_counter() - waiter.enqueued_at) * 1000)
+                woken.append(waiter)
+            if queue and not self._at_cap(name):
+                # Lower classes must not overtake a higher class waiting for a free slot
+                break
+        return woken
+
+    def acquire(self, name: str) -> None:
+        """Blocking acquire for sync (WSGI) request handling"""
+        with self._lock:
+            waiter = self._try_enter(name)
+            if waiter is None:
+                return
+            waiter.event = threading.Event()
+        if not waiter.event.wait(self.classes[name]['timeout']) and not self._give_up(waiter):
+            raise Rejected(name)
+
+    async def acquire_async(self, name: str) -> None:
+        """Non-blocking acquire for async (ASGI) request handling"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._try_enter(name)
+            if waiter is None:
+                return
+            waiter.loop = loop
+            waiter.future = loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.classes[name]['timeout'])
+        except asyncio.TimeoutError:
+            if not self._give_up(waiter):
+                raise Rejected(name)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot granted meanwhile
+            if self._give_up(waiter):
+                self.release(name)
+            raise
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self.active -= 1
+            self.active_by_class[name] -= 1
+            woken = self._grant_waiting()
+        for waiter in woken:
+            waiter.wake()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current load and counters per class"""
+        with self._lock:
+            classes = {}
+            for name in self.order:
+                metrics = dict(self.metrics[name])
+                admitted = metrics['admitted']
+                metrics['queue_time_avg_ms'] = round(metrics['queue_time_total_ms'] / admitted, 3) if admitted else 0.0
+                metrics['active'] = self.active_by_class[name]
+                metrics['waiting'] = len(self.waiters[name])
+                classes[name] = metrics
+            return {
+                'max_concurrent': self.max_concurrent,
+                'active': self.active,
+                'classes': classes,
+            }
+
+
+class Rejected(Exception):
+    """Raised when a request cannot be admitted"""
+
+    def __init__(self, request_class: str):
+        super().__init__(request_class)
+        self.request_class = request_class
+
+
+_gate: Optional[PriorityGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_gate() -> PriorityGate:
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            config = settings.ADMISSION_CONTROL
+            _gate = PriorityGate(config['max_concurrent'], config['classes'])
+        return _gate
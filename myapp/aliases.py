@@ -0,0 +1,106 @@
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from .models import MenuAlias, MenuItem
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# phrase -> menu item id, loaded lazily from MenuAlias and kept in sync by signals
+_aliases: Optional[Dict[str, int]] = None
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(' ', text.lower())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _get_aliases() -> Dict[str, int]:
+    global _aliases
+    with _lock:
+        if _aliases is None:
+            _aliases = dict(MenuAlias.objects.values_list('phrase', 'menu_item_id'))
+            logger.info("Loaded %s menu aliases", len(_aliases))
+        return _aliases
+
+
+def reset_alias_cache() -> None:
+    """Drop the in-memory alias table so it is reloaded on next lookup"""
+    global _aliases
+    with _lock:
+        _aliases = None
+
+
+def cache_alias(phrase: str, menu_item_id: int) -> None:
+    """Add or update a single alias in the in-memory table"""
+    with _lock:
+        if _aliases is not None:
+            _aliases[phrase] = menu_item_id
+
+
+def uncache_alias(phrase: str) -> None:
+    """Remove a single alias from the in-memory table"""
+    with _lock:
+        if _aliases is not None:
+            _aliases.pop(phrase, None)
+
+
+def lookup_alias(query: str) -> Optional[MenuItem]:
+    """Resolve a phrase through the learned alias table"""
+    item_id = _get_aliases().get(normalize_phrase(query))
+    item = MenuItem.objects.filter(pk=item_id).first() if item_id is not None else None
+
+    with _lock:
+        _stats['hits' if item else 'misses'] += 1
+    return item
+
+
+def lookup_aliases(queries: List[str]) -> Dict[str, int]:
+    """Resolve many phrases through the alias table at once: query -> menu item id"""
+    aliases = _get_aliases()
+    found = {}
+    for query in queries:
+        item_id = aliases.get(normalize_phrase(query))
+        if item_id is not None:
+            found[query] = item_id
+
+    with _lock:
+        _stats['hits'] += len(found)
+        _stats['misses'] += len(queries) - len(found)
+    return found
+
+
+def learn_alias(query: str, menu_item: MenuItem, source: str = 'order') -> Optional[MenuAlias]:
+    """Remember that a phrase resolved to a menu item"""
+    phrase = normalize_phrase(query)
+    if not phrase:
+        return None
+    if _get_aliases().get(phrase) == menu_item.id:
+        return None
+
+    alias, _ = MenuAlias.objects.update_or_create(
+        phrase=phrase,
+        defaults={'menu_item': menu_item, 'source': source}
+    )
+    return alias
+
+
+def alias_stats() -> Dict[str, Any]:
+    """Alias lookup counters and hit rate"""
+    with _lock:
+        hits, misses = _stats['hits'], _stats['misses']
+        size = len(_aliases) if _aliases is not None else None
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+        'size': size,
+    }
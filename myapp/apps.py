@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MyappConfig(AppConfig):
+    name = 'myapp'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,103 @@
+import logging
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order
+from .serializers import ORDER_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def archive_candidates(
+    max_age_days: Optional[int] = None,
+    terminal_after_hours: Optional[int] = None,
+    now=None,
+) -> QuerySet:
+    """Orders that are old enough, or finished long enough ago, to archive"""
+    now = now or timezone.now()
+    if max_age_days is None:
+        max_age_days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    if terminal_after_hours is None:
+        terminal_after_hours = settings.ORDER_ARCHIVE_TERMINAL_AFTER_HOURS
+
+    return Order.objects.filter(
+        Q(created_at__lt=now - timedelta(days=max_age_days)) |
+        Q(status__in=Order.TERMINAL_STATUSES,
+          updated_at__lt=now - timedelta(hours=terminal_after_hours))
+    )
+
+
+def archive_orders(
+    max_age_days: Optional[int] = None,
+    terminal_after_hours: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Move archivable orders into ArchivedOrder in short, chunked transactions
+
+    Run from another process (the management command), this does not reach
+    the server's cached orders snapshot or active-order index: archived
+    orders stay on the WebSocket feed until the server's next order change.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    now = timezone.now()
+    candidates = archive_candidates(max_age_days, terminal_after_hours, now=now)
+    moved = 0
+    last_pk = 0
+
+    while True:
+        # Walk the keys outside the transaction, so skipped orders are not picked again
+        ids = list(candidates.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        # SQLite transactions start IMMEDIATE (see DATABASES), so the rows read
+        # here cannot change before they are deleted
+        with transaction.atomic():
+            batch = list(candidates.filter(pk__in=ids))
+            ArchivedOrder.objects.bulk_create([
+                ArchivedOrder(
+                    id=order.id,
+                    created_at=order.created_at,
+                    updated_at=order.updated_at,
+                    status=order.status,
+                    customer_name=order.customer_name,
+                    special_instructions=order.special_instructions,
+                    item_name=order.item_name,
+                    item_price=order.item_price,
+                    quantity=order.quantity,
+                    total_amount=order.total_amount,
+                    archived_at=now,
+                ) for order in batch
+            ], ignore_conflicts=True)
+
+            # Skipped inserts leave an older archive row behind; only delete
+            # orders whose own copy (same id and creation time) is archived
+            archived = set(ArchivedOrder.objects.filter(pk__in=ids).values_list('id', 'created_at'))
+            done = [order.pk for order in batch if (order.pk, order.created_at) in archived]
+            Order.objects.filter(pk__in=done).delete()
+
+        skipped = len(batch) - len(done)
+        if skipped:
+            logger.warning("Kept %s orders whose ids are already taken in the archive", skipped)
+        moved += len(done)
+        logger.info("Archived %s orders (%s total)", len(done), moved)
+        if progress:
+            progress(moved)
+
+    return moved
+
+
+def order_history(include_archived: bool = True, **filters) -> QuerySet:
+    """Order rows from the hot table, optionally unioned with the archive"""
+    hot = Order.objects.filter(**filters).values_list(*ORDER_FIELDS)
+    if not include_archived:
+        return hot
+    cold = ArchivedOrder.objects.filter(**filters).values_list(*ORDER_FIELDS)
+    return hot.union(cold, all=True)
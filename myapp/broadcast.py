@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .aliases import normalize_phrase
+from .serializers import dumps, serialize_orders
+
+logger = logging.getLogger(__name__)
+
+ORDERS_GROUP = "orders"
+
+# Bumped whenever this process creates, changes or deletes an order. Snapshots
+# are cached against it and the database stamp (orders_stamp), which also
+# moves when another process or a command writes orders, so every client sees
+# the same encoded payload.
+_orders_version = 0
+_version_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+_rows: Tuple[Optional[tuple], Optional[List[Dict[str, Any]]]] = (None, None)
+# filter signature -> (orders version, time bucket, encoded snapshot), least recently used first
+_snapshots: "OrderedDict[str, Tuple[tuple, Optional[int], str]]" = OrderedDict()
+
+# Filters with at least one subscriber in this process: group -> [filter, subscribers]
+_subscriptions: Dict[str, list] = {}
+_subscriptions_lock = threading.Lock()
+
+
+class OrderFilter:
+    """Server-side subscription filter for the orders stream
+
+    Orders can be narrowed by status, by item name and to those created in
+    the last `since_minutes` minutes. Clients sharing a filter share a group
+    and one encoded snapshot.
+    """
+
+    def __init__(
+        self,
+        statuses: FrozenSet[str] = frozenset(),
+        items: FrozenSet[str] = frozenset(),
+        since_minutes: Optional[int] = None,
+    ):
+        self.statuses = statuses
+        self.items = items
+        self.since_minutes = since_minutes
+
+    @classmethod
+    def parse(cls, data: Dict[str, Any]) -> "OrderFilter":
+        """Build a filter from a subscribe message or query parameters; raises ValueError"""
+        Order = apps.get_model('myapp', 'Order')
+        valid_statuses = {status for status, _ in Order.STATUS_CHOICES}
+
+        def as_list(value) -> List[str]:
+            if not value:
+                return []
+            if isinstance(value, str):
+                value = value.split(',')
+            return [str(v).strip() for v in value if str(v).strip()]
+
+        statuses = frozenset(as_list(data.get('statuses')))
+        unknown = statuses - valid_statuses
+        if unknown:
+            raise ValueError(f"Unknown statuses: {', '.join(sorted(unknown))}")
+
+        items = frozenset(normalize_phrase(item) for item in as_list(data.get('items')))
+
+        since_minutes = data.get('since_minutes')
+        if since_minutes in (None, ''):
+            since_minutes = None
+        else:
+            since_minutes = int(since_minutes)
+            if since_minutes <= 0:
+                raise ValueError("since_minutes must be positive")
+
+        return cls(statuses, items, since_minutes)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.statuses and not self.items and self.since_minutes is None
+
+    @property
+    def signature(self) -> str:
+        return "|".join([
+            ",".join(sorted(self.statuses)),
+            ",".join(sorted(self.items)),
+            str(self.since_minutes or ''),
+        ])
+
+    @property
+    def group_name(self) -> str:
+        if self.is_empty:
+            return ORDERS_GROUP
+        return f"{ORDERS_GROUP}.{hashlib.sha1(self.signature.encode()).hexdigest()[:16]}"
+
+    def apply(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.is_empty:
+            return rows
+        cutoff = None
+        if self.since_minutes is not None:
+            # Rows carry UTC isoformat timestamps, which sort as strings
+            cutoff = (timezone.now() - timedelta(minutes=self.since_minutes)).isoformat()
+        return [
+            row for row in rows
+            if (not self.statuses or row['status'] in self.statuses)
+            and (not self.items or normalize_phrase(row['item_name']) in self.items)
+            and (cutoff is None or row['created_at'] >= cutoff)
+        ]
+
+
+def get_orders_version() -> int:
+    """Current orders version"""
+    return _orders_version
+
+
+def invalidate_orders_snapshot() -> None:
+    """Mark the cached orders snapshot as stale"""
+    global _orders_version
+    with _version_lock:
+        _orders_version += 1
+
+
+def orders_stamp() -> tuple:
+    """Order count, newest id and newest change; moves with any write from any process"""
+    Order = apps.get_model('myapp', 'Order')
+    stamp = Order.objects.aggregate(count=Count('id'), last_id=Max('id'), last_change=Max('updated_at'))
+    return stamp['count'], stamp['last_id'], stamp['last_change']
+
+
+def load_orders() -> List[Dict[str, Any]]:
+    """Get all orders from database"""
+    # Get Order model after apps are ready
+    Order = apps.get_model('myapp', 'Order')
+    return serialize_orders(Order.objects.order_by('-created_at'))
+
+
+def encode_orders_update(orders: List[Dict[str, Any]]) -> str:
+    """Encode an orders_update message for WebSocket clients"""
+    return dumps({
+        'type': 'orders_update',
+        'orders': orders
+    })
+
+
+def get_orders_snapshot(order_filter: Optional[OrderFilter] = None) -> str:
+    """Get the encoded (filtered) orders snapshot, rebuilding it only when orders changed"""
+    global _rows
+    order_filter = order_filter or OrderFilter()
+    # Time-window snapshots also go stale as the window slides
+    bucket = int(timezone.now().timestamp() // 60) if order_filter.since_minutes else None
+    stamp = orders_stamp()
+
+    with _snapshot_lock:
+        version = (_orders_version, stamp)
+        cached = _snapshots.get(order_filter.signature)
+        if cached is not None and cached[0] == version and cached[1] == bucket:
+            _snapshots.move_to_end(order_filter.signature)
+            return cached[2]
+
+        rows_version, rows = _rows
+        if rows_version != version or rows is None:
+            rows = load_orders()
+            _rows = (version, rows)
+            # Drop snapshots of older versions
+            for signature in [s for s, c in _snapshots.items() if c[0] != version]:
+                del _snapshots[signature]
+            logger.debug("Reloaded orders for version %s", version)
+
+        text = encode_orders_update(order_filter.apply(rows))
+        _snapshots[order_filter.signature] = (version, bucket, text)
+        _snapshots.move_to_end(order_filter.signature)
+        # Clients choose their own filters, so bound how many are kept
+        while len(_snapshots) > settings.ORDERS_SNAPSHOT_CACHE_MAX:
+            _snapshots.popitem(last=False)
+        return text
+
+
+def subscribe(order_filter: OrderFilter) -> str:
+    """Register a subscriber for a filter and return its group"""
+    group = order_filter.group_name
+    with _subscriptions_lock:
+        entry = _subscriptions.setdefault(group, [order_filter, 0])
+        entry[1] += 1
+    return group
+
+
+def unsubscribe(order_filter: OrderFilter) -> None:
+    group = order_filter.group_name
+    with _subscriptions_lock:
+        entry = _subscriptions.get(group)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del _subscriptions[group]
+
+
+def broadcast_orders() -> None:
+    """Broadcast the current orders snapshot to every subscribed group"""
+    with _subscriptions_lock:
+        filters = [entry[0] for group, entry in _subscriptions.items() if group != ORDERS_GROUP]
+
+    channel_layer = get_channel_layer()
+    # The unfiltered group always gets the update, other processes may have subscribers
+    for order_filter in [OrderFilter()] + filters:
+        async_to_sync(channel_layer.group_send)(
+            order_filter.group_name,
+            {
+                "type": "orders_update",
+                "text": get_orders_snapshot(order_filter)
+            }
+        )
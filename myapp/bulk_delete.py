@@ -0,0 +1,85 @@
+import logging
+from typing import Callable, Optional, Sequence, Tuple, Type
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Max, QuerySet
+
+from .aliases import reset_alias_cache
+from .broadcast import invalidate_orders_snapshot
+from .idempotency import tool_call_responses
+from .models import MenuAlias, MenuItem, Order
+from .order_index import active_orders
+from .search import invalidate_menu_index
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_chunks(
+    queryset: QuerySet,
+    batch_size: Optional[int] = None,
+    dependents: Sequence[Tuple[Type[models.Model], str]] = (),
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Delete rows in primary-key ranges of at most `batch_size`, one short transaction each
+
+    Rows are removed with raw DELETEs: no objects are loaded, no signals are
+    sent and nothing cascades. Rows of `dependents` (model, foreign key field)
+    pointing at a range are deleted first, in the same transaction. Rows added
+    after the job started are left alone.
+    """
+    batch_size = batch_size or settings.BULK_DELETE_BATCH_SIZE
+    queryset = queryset.order_by()
+    highest = queryset.aggregate(highest=Max('pk'))['highest']
+    if highest is None:
+        return 0
+
+    deleted = 0
+    lower = None
+    while True:
+        # Find the range before the transaction: on SQLite a transaction that
+        # reads before it writes fails at once when another connection writes
+        todo = queryset.filter(pk__lte=highest)
+        if lower is not None:
+            todo = todo.filter(pk__gt=lower)
+        bound = list(todo.order_by('pk').values_list('pk', flat=True)[batch_size - 1:batch_size])
+        upper = bound[0] if bound else highest
+        chunk = todo.filter(pk__lte=upper)
+
+        with transaction.atomic():
+            for model, field in dependents:
+                related = model.objects.filter(**{f'{field}__in': chunk.values('pk')})
+                related._raw_delete(related.db)
+            count = chunk._raw_delete(chunk.db)
+
+        deleted += count
+        if progress and count:
+            progress(deleted)
+        if not bound or upper >= highest:
+            return deleted
+        lower = upper
+
+
+def clear_orders(progress: Optional[Callable[[int], None]] = None) -> int:
+    """Delete every order, then refresh the order caches once"""
+    try:
+        return delete_in_chunks(Order.objects.all(), progress=progress)
+    finally:
+        # The Order signals never fired for these rows
+        invalidate_orders_snapshot()
+        active_orders.reset()
+        # Retries must not be told about orders that no longer exist
+        tool_call_responses.clear()
+
+
+def clear_menu(progress: Optional[Callable[[int], None]] = None) -> int:
+    """Delete every menu item and its aliases, then refresh the menu caches once"""
+    try:
+        return delete_in_chunks(
+            MenuItem.objects.all(),
+            dependents=[(MenuAlias, 'menu_item')],
+            progress=progress,
+        )
+    finally:
+        invalidate_menu_index()
+        reset_alias_cache()
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+class CallSession:
+    """What we already know about one VAPI phone call"""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        # normalized phrase -> menu item id
+        self.resolved_items: Dict[str, int] = {}
+        self.customer_name = ''
+        # (menu version, rendered menu text)
+        self.menu_text: Optional[Tuple[int, str]] = None
+        self.touched_at = time.monotonic()
+
+
+class CallSessionStore:
+    """Bounded LRU of call sessions that expire after a period of inactivity"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, CallSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, call_id: str) -> Optional[CallSession]:
+        """Session for a call, created on first use; None without a call id"""
+        if not call_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(call_id)
+            if session is None:
+                self.misses += 1
+                session = CallSession(call_id)
+                self._sessions[call_id] = session
+                while len(self._sessions) > self.max_size:
+                    self._sessions.popitem(last=False)
+            else:
+                self.hits += 1
+                self._sessions.move_to_end(call_id)
+            session.touched_at = now
+            return session
+
+    def _expire(self, now: float) -> None:
+        # Sessions are ordered by last use, so expired ones sit at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.touched_at < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def discard(self, call_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(call_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+call_sessions = CallSessionStore(settings.CALL_SESSION_MAX, settings.CALL_SESSION_TTL)
@@ -0,0 +1,92 @@
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+COMPRESSION_METHODS = ('none', 'float16', 'int8', 'pca')
+# Methods that scan at least as fast as uncompressed rows; float16/int8 only save memory
+FAST_COMPRESSION_METHODS = ('none', 'pca')
+# Rows widened to float32 at a time when scoring float16/int8 matrices (~6 MB at 1536 dims)
+SCORE_BLOCK_ROWS = 1024
+
+
+def _normalize(matrix: NDArray) -> NDArray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingCodec:
+    """Compresses row-normalized menu embeddings and scores queries against them
+
+    Supported methods:
+    - none: float32 rows
+    - float16: half-precision rows (smaller, but scans slower than none)
+    - int8: symmetric per-row quantization with a float32 scale per row
+      (smaller, but scans slower than none)
+    - pca: rows projected onto the top principal components, re-normalized
+    """
+
+    def __init__(self, method: str = 'none', n_components: int = 256):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown embedding compression '{method}', expected one of {COMPRESSION_METHODS}")
+        self.method = method
+        self.n_components = n_components
+        self.mean: Optional[NDArray] = None
+        self.components: Optional[NDArray] = None
+        self.scales: Optional[NDArray] = None
+
+    def encode(self, matrix: NDArray) -> NDArray:
+        """Fit the codec on normalized float32 rows and return the stored matrix"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+
+        if self.method == 'float16':
+            return matrix.astype(np.float16)
+
+        if self.method == 'int8':
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.scales = scales.astype(np.float32)
+            return np.round(matrix / self.scales[:, None]).astype(np.int8)
+
+        if self.method == 'pca':
+            n_components = min(self.n_components, matrix.shape[1])
+            if matrix.shape[0] < n_components:
+                # Too few rows to learn a useful projection, keep full precision
+                self.method = 'none'
+                return matrix
+
+            from sklearn.decomposition import PCA
+            pca = PCA(n_components=n_components, svd_solver='auto', random_state=0)
+            reduced = pca.fit_transform(matrix)
+            self.mean = pca.mean_.astype(np.float32)
+            self.components = pca.components_.astype(np.float32)
+            return _normalize(reduced).astype(np.float32)
+
+        return matrix
+
+    def encode_queries(self, queries: NDArray) -> NDArray:
+        """Project normalized query rows into the stored space"""
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.method == 'pca':
+            return _normalize((queries - self.mean) @ self.components.T)
+        return queries
+
+    def scores(self, queries: NDArray, stored: NDArray) -> NDArray:
+        """Cosine scores of every (encoded) query against every stored row"""
+        if self.method not in ('int8', 'float16'):
+            return queries @ stored.T
+
+        # Widen one block of rows at a time instead of copying the whole matrix to float32
+        scores = np.empty((len(queries), len(stored)), dtype=np.float32)
+        for start in range(0, len(stored), SCORE_BLOCK_ROWS):
+            block = stored[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            np.matmul(queries, block.T, out=scores[:, start:start + len(block)])
+        if self.method == 'int8':
+            scores *= self.scales
+        return scores
+
+    def nbytes(self, stored: NDArray) -> int:
+        """Memory held by the stored matrix and codec parameters"""
+        extras = [a for a in (self.mean, self.components, self.scales) if a is not None]
+        return stored.nbytes + sum(a.nbytes for a in extras)
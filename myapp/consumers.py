@@ -1,52 +1,89 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
+from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
-from django.apps import apps
+from .broadcast import OrderFilter, get_orders_snapshot, subscribe, unsubscribe
 
 class OrderConsumer(AsyncWebsocketConsumer):
+    order_filter = None
+    group_name = None
+
     async def connect(self):
         """When client connects"""
         # Accept all connections for now
         await self.accept()
-        
-        # Add to orders group
-        await self.channel_layer.group_add("orders", self.channel_name)
-        
-        # Send current orders
-        await self.send_orders()
+
+        # Optional filters: ?statuses=pending,preparing&items=...&since_minutes=60
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            order_filter = OrderFilter.parse({key: ','.join(values) for key, values in query.items()})
+        except ValueError as e:
+            await self.send_error(str(e))
+            order_filter = OrderFilter()
+
+        # Join the group for this filter and send current orders
+        await self.subscribe(order_filter)
 
     async def disconnect(self, close_code):
         """When client disconnects"""
-        await self.channel_layer.group_discard("orders", self.channel_name)
+        await self.leave_group()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """Clients can change their filter with a subscribe message"""
+        try:
+            message = json.loads(text_data or '')
+        except json.JSONDecodeError:
+            await self.send_error("Invalid JSON")
+            return
+        if not isinstance(message, dict):
+            await self.send_error("Message must be a JSON object")
+            return
+
+        if message.get('type') != 'subscribe':
+            await self.send_error(f"Unknown message type: {message.get('type')}")
+            return
+
+        try:
+            order_filter = OrderFilter.parse(message)
+        except (TypeError, ValueError) as e:
+            await self.send_error(str(e))
+            return
+        await self.leave_group()
+        await self.subscribe(order_filter)
+
+    async def subscribe(self, order_filter):
+        self.order_filter = order_filter
+        self.group_name = subscribe(order_filter)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send_orders()
+
+    async def leave_group(self):
+        if self.group_name is not None:
+            unsubscribe(self.order_filter)
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            self.group_name = None
 
     @database_sync_to_async
-    def get_orders(self):
-        """Get all orders from database"""
-        # Get Order model after apps are ready
-        Order = apps.get_model('myapp', 'Order')
-        orders = Order.objects.all().order_by('-created_at')
-        return [{
-            'id': order.id,
-            'status': order.status,
-            'customer_name': order.customer_name,
-            'created_at': order.created_at.isoformat(),
-            'total_amount': str(order.total_amount),
-            'special_instructions': order.special_instructions,
-            'item_name': order.item_name,
-            'quantity': order.quantity,
-            'item_price': str(order.item_price)
-        } for order in orders]
+    def get_snapshot(self):
+        """Get the shared, pre-encoded orders snapshot for this client's filter"""
+        return get_orders_snapshot(self.order_filter)
 
     async def orders_update(self, event):
         """Send order updates to WebSocket"""
+        # Broadcasts carry a payload encoded once for the whole group
+        if 'text' in event:
+            await self.send(text_data=event['text'])
+            return
         await self.send(text_data=json.dumps({
             'type': 'orders_update',
             'orders': event['orders']
         }))
 
     async def send_orders(self):
-        orders = await self.get_orders()
+        await self.send(text_data=await self.get_snapshot())
+
+    async def send_error(self, message):
         await self.send(text_data=json.dumps({
-            'type': 'orders_update',
-            'orders': orders
-        })) 
\ No newline at end of file
+            'type': 'error',
+            'message': message
+        }))
@@ -0,0 +1,159 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Count
+
+from .models import MenuItem
+from .search import get_active_embedding_model, invalidate_menu_index
+from .utils import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# The embedding_status column is the queue: rows marked 'pending' are waiting
+# for a worker, so queued work survives a restart.
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_running = 0
+_rewake = False
+
+
+def start() -> None:
+    """Start the worker pool and pick up work left behind by a previous process"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            return
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.EMBEDDING_WORKERS,
+            thread_name_prefix='embedding'
+        )
+
+    try:
+        # Anything mid-flight when the last process died goes back on the queue
+        requeued = MenuItem.objects.filter(embedding_status='processing').update(embedding_status='pending')
+        if requeued:
+            logger.info("Requeued %s interrupted embedding jobs", requeued)
+    except Exception as e:
+        # The table may not exist yet, e.g. before the first migrate
+        logger.warning("Could not resume embedding queue: %s", e)
+    wake()
+
+
+def enqueue(item_ids: Iterable[int]) -> int:
+    """Mark items as waiting for an embedding and wake the workers"""
+    count = MenuItem.objects.filter(pk__in=list(item_ids)).update(
+        embedding_status='pending',
+        embedding_error=''
+    )
+    if count:
+        wake()
+    return count
+
+
+def wake() -> None:
+    """Make sure enough workers are draining the queue"""
+    global _running, _rewake
+    if _executor is None:
+        start()
+        return
+    with _lock:
+        # Busy workers take another pass before exiting
+        _rewake = True
+        missing = max(settings.EMBEDDING_WORKERS - _running, 0)
+        _running += missing
+    for _ in range(missing):
+        _executor.submit(_drain)
+
+
+def _claim_batch() -> list:
+    """Atomically move up to one batch of pending items to processing"""
+    candidates = list(
+        MenuItem.objects.filter(embedding_status='pending')
+        .order_by('pk')
+        .values_list('id', 'name', 'description')[:settings.EMBEDDING_BATCH_SIZE]
+    )
+    return [
+        row for row in candidates
+        if MenuItem.objects.filter(pk=row[0], embedding_status='pending').update(embedding_status='processing')
+    ]
+
+
+def _drain() -> None:
+    """Embed pending items until the queue is empty"""
+    global _running, _rewake
+    close_old_connections()
+    batch: list = []
+    try:
+        while True:
+            batch = []
+            batch = _claim_batch()
+            if not batch:
+                with _lock:
+                    if not _rewake:
+                        _running -= 1
+                        return
+                    _rewake = False
+                continue
+
+            model = get_active_embedding_model()
+            try:
+                vectors = get_embeddings([f"{name} {description}" for _, name, description in batch], model=model)
+            except Exception as e:
+                logger.error("Embedding batch of %s items failed: %s", len(batch), e)
+                MenuItem.objects.filter(
+                    pk__in=[item_id for item_id, _, _ in batch],
+                    embedding_status='processing'
+                ).update(embedding_status='failed', embedding_error=str(e))
+                continue
+
+            if get_active_embedding_model() != model:
+                # A re-embedding job switched models meanwhile, redo the batch with the new one
+                MenuItem.objects.filter(
+                    pk__in=[item_id for item_id, _, _ in batch],
+                    embedding_status='processing'
+                ).update(embedding_status='pending')
+                continue
+
+            for (item_id, _, _), vector in zip(batch, vectors):
+                # Items edited meanwhile were put back to pending and are skipped here
+                MenuItem.objects.filter(pk=item_id, embedding_status='processing').update(
+                    embedding=vector.tolist(),
+                    embedding_model=model,
+                    embedding_status='ready',
+                    embedding_error=''
+                )
+            invalidate_menu_index()
+            logger.info("Embedded %s menu items", len(batch))
+    except Exception as e:
+        logger.error("Embedding worker error: %s", e, exc_info=True)
+        with _lock:
+            _running -= 1
+        _release(batch, str(e))
+    finally:
+        connection.close()
+
+
+def _release(batch: list, error: str) -> None:
+    """Mark the rows a dead worker had claimed as failed, so retry_embeddings can requeue them"""
+    if not batch:
+        return
+    try:
+        MenuItem.objects.filter(
+            pk__in=[item_id for item_id, _, _ in batch],
+            embedding_status='processing'
+        ).update(embedding_status='failed', embedding_error=error)
+    except Exception as e:
+        # Still stuck in processing; start() requeues them on the next restart
+        logger.error("Could not release %s claimed menu items: %s", len(batch), e)
+
+
+def progress() -> Dict[str, int]:
+    """Item counts per embedding status"""
+    counts = {status: 0 for status, _ in MenuItem.EMBEDDING_STATUS_CHOICES}
+    for row in MenuItem.objects.values('embedding_status').annotate(count=Count('id')):
+        counts[row['embedding_status']] = row['count']
+    return counts
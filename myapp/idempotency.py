@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+class ToolCallResponseCache:
+    """Bounded LRU of webhook results keyed by VAPI toolCallId
+
+    VAPI retries a tool call when we answer too slowly; a retry gets the
+    stored result back instead of placing the order again.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # toolCallId -> (stored at, response body)
+        self._responses: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tool_call_id: str) -> Optional[Dict[str, Any]]:
+        if not tool_call_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._responses.get(tool_call_id)
+            if entry is None or now - entry[0] >= self.ttl:
+                self._responses.pop(tool_call_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._responses.move_to_end(tool_call_id)
+            return entry[1]
+
+    def put(self, tool_call_id: str, response: Dict[str, Any]) -> None:
+        if not tool_call_id:
+            return
+        with self._lock:
+            self._responses[tool_call_id] = (time.monotonic(), response)
+            self._responses.move_to_end(tool_call_id)
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'responses': len(self._responses),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+tool_call_responses = ToolCallResponseCache(settings.TOOL_CALL_CACHE_MAX, settings.TOOL_CALL_CACHE_TTL)
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from django.conf import settings
+
+from .compression import EmbeddingCodec
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = 'CURRENT'
+CODEC_ARRAYS = ('scales', 'mean', 'components')
+
+
+def store_dir() -> Optional[Path]:
+    """Directory shared by all workers, or None when sharing is disabled"""
+    return Path(settings.MENU_INDEX_DIR) if settings.MENU_INDEX_DIR else None
+
+
+def current_version() -> Optional[str]:
+    """Name of the published version the pointer file refers to"""
+    directory = store_dir()
+    if directory is None:
+        return None
+    try:
+        return (directory / POINTER_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(ids: NDArray, matrix: NDArray, codec: EmbeddingCodec, model: str, built_at: int) -> str:
+    """Write a new index version and atomically point every worker at it
+
+    `built_at` is when the rows were read from the database (time.time_ns());
+    a version built from older rows never replaces a newer one.
+    """
+    directory = store_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    name = f"v{built_at}-{uuid.uuid4().hex[:8]}"
+    staging = directory / f".{name}.tmp"
+    staging.mkdir()
+    np.save(staging / 'ids.npy', np.ascontiguousarray(ids, dtype=np.int64))
+    np.save(staging / 'matrix.npy', np.ascontiguousarray(matrix))
+    for attr in CODEC_ARRAYS:
+        value = getattr(codec, attr)
+        if value is not None:
+            np.save(staging / f'{attr}.npy', value)
+    (staging / 'meta.json').write_text(json.dumps({
+        'method': codec.method,
+        'n_components': codec.n_components,
+        'model': model,
+    }))
+    os.replace(staging, directory / name)
+
+    current = current_version()
+    if current and current > name:
+        logger.info("Menu index %s is newer than %s, not switching", current, name)
+        return name
+
+    # Readers see either the old or the new pointer, never a partial one
+    pointer = directory / f".{POINTER_FILE}.{name}.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, directory / POINTER_FILE)
+
+    prune(keep=name)
+    logger.info("Published menu index %s with %s items", name, len(ids))
+    return name
+
+
+def load(name: str) -> Optional[Tuple[NDArray, NDArray, EmbeddingCodec, str]]:
+    """Memory-map a published version; None if it has already been pruned"""
+    path = store_dir() / name
+    try:
+        meta: Dict[str, Any] = json.loads((path / 'meta.json').read_text())
+        ids = np.load(path / 'ids.npy', mmap_mode='r')
+        matrix = np.load(path / 'matrix.npy', mmap_mode='r')
+        codec = EmbeddingCodec(meta['method'], meta['n_components'])
+        for attr in CODEC_ARRAYS:
+            if (path / f'{attr}.npy').exists():
+                setattr(codec, attr, np.load(path / f'{attr}.npy', mmap_mode='r'))
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        logger.warning("Could not load menu index %s: %s", name, e)
+        return None
+    return ids, matrix, codec, meta['model']
+
+
+def prune(keep: str) -> None:
+    """Remove all but the newest versions; mapped files stay readable until unmapped"""
+    directory = store_dir()
+    versions = sorted(
+        (p for p in directory.iterdir() if p.is_dir() and p.name.startswith('v')),
+        key=lambda p: p.name,
+        reverse=True,
+    )
+    for old in versions[settings.MENU_INDEX_KEEP_VERSIONS:]:
+        if old.name != keep:
+            shutil.rmtree(old, ignore_errors=True)
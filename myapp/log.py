@@ -0,0 +1,151 @@
+# Referenced from settings.LOGGING, so nothing here may import Django models
+import json
+import logging
+import queue
+import random
+import time
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class LazyJson:
+    """Defers json.dumps of a log argument until the record is actually emitted"""
+
+    __slots__ = ('value', 'indent')
+
+    def __init__(self, value: Any, indent: Optional[int] = None):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=self.indent, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of low-level records from selected loggers
+
+    `rates` maps logger names to the fraction kept; the longest matching
+    name prefix wins. Records above `max_level` always pass.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, max_level: str = 'INFO'):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.max_level = logging.getLevelName(max_level)
+        self._cache: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            matched = ''
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > len(matched):
+                    matched, rate = prefix, prefix_rate
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class AsyncLogHandler(QueueHandler):
+    """Hands records to a background thread that formats and writes them
+
+    The caller only copies the record onto a bounded queue. When the queue
+    is full the record is dropped and counted rather than blocking a request;
+    once there is room again a warning with the count is logged, at most
+    every `report_interval` seconds.
+    """
+
+    instances: "weakref.WeakSet[AsyncLogHandler]" = weakref.WeakSet()
+
+    def __init__(self, maxsize: int = 10000, target: Optional[logging.Handler] = None,
+                 report_interval: float = 60.0):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target or logging.StreamHandler()
+        self.dropped = 0
+        self.reported = 0
+        self.report_interval = report_interval
+        self._last_report = 0.0
+        AsyncLogHandler.instances.add(self)
+        self.listener: Optional[QueueListener] = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt: Optional[logging.Formatter]) -> None:
+        # Formatting happens in the listener thread, on the target handler
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        if record.exc_info:
+            # Tracebacks reference live frames, render them before handing off
+            record.exc_text = (self.target.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported and time.monotonic() - self._last_report >= self.report_interval:
+            self.report_dropped()
+
+    def report_dropped(self) -> None:
+        warning = logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': 'WARNING',
+            'msg': "Dropped %s log records while the log queue was full",
+            'args': (self.dropped - self.reported,),
+        })
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            return
+        self.reported = self.dropped
+        self._last_report = time.monotonic()
+
+    def close(self) -> None:
+        # Drains whatever is still queued
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+def dropped_log_records() -> int:
+    """Records dropped by every AsyncLogHandler in this process since it started"""
+    return sum(handler.dropped for handler in AsyncLogHandler.instances)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from myapp.archive import archive_candidates, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move old and finished orders from the hot Order table into the archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Archive orders older than this many days")
+        parser.add_argument('--terminal-hours', type=int, default=None,
+                            help="Archive completed/cancelled orders untouched for this many hours")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Orders moved per transaction")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many orders would be archived")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive_candidates(options['days'], options['terminal_hours']).count()
+            self.stdout.write(f"{count} orders would be archived")
+            return
+
+        moved = archive_orders(
+            max_age_days=options['days'],
+            terminal_after_hours=options['terminal_hours'],
+            batch_size=options['batch_size'],
+            progress=lambda total: self.stdout.write(f"Archived {total} orders so far"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders"))
+        if moved:
+            # Caches live in the server process and are refreshed on its next order change
+            self.stdout.write("Running servers keep showing archived orders until their next order change")
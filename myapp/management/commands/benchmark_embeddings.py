@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from myapp.compression import COMPRESSION_METHODS, FAST_COMPRESSION_METHODS
+from myapp.models import MenuItem
+from myapp.search import MenuIndex
+
+
+def synthetic_embeddings(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Clustered vectors with a low-rank structure, roughly like real text embeddings"""
+    n_topics = 64
+    basis = rng.normal(size=(n_topics, dim))
+    weights = rng.normal(size=(n, n_topics)) * rng.exponential(size=n_topics)
+    return (weights @ basis + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+class Command(BaseCommand):
+    help = "Compare compressed menu index modes against full-precision search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000,
+                            help="Synthetic menu size (ignored with --from-db)")
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--dim', type=int, default=1536)
+        parser.add_argument('--top-k', type=int, default=10)
+        parser.add_argument('--components', type=int, default=256,
+                            help="PCA components")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Timed search passes per method")
+        parser.add_argument('--methods', default=','.join(FAST_COMPRESSION_METHODS),
+                            help=f"Comma-separated subset of {', '.join(COMPRESSION_METHODS)}")
+        parser.add_argument('--from-db', action='store_true',
+                            help="Use stored MenuItem embeddings instead of synthetic ones")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        top_k = options['top_k']
+
+        if options['from_db']:
+            rows = [e for e in MenuItem.objects.filter(embedding__isnull=False).values_list('embedding', flat=True) if e]
+            if not rows:
+                self.stderr.write("No stored embeddings found")
+                return
+            embeddings = np.asarray(rows, dtype=np.float32)
+            # Perturbed copies of real items stand in for caller queries
+            picks = embeddings[rng.integers(0, len(embeddings), options['queries'])]
+            queries = picks + 0.3 * picks.std() * rng.normal(size=picks.shape).astype(np.float32)
+        else:
+            embeddings = synthetic_embeddings(options['items'] + options['queries'], options['dim'], rng)
+            embeddings, queries = embeddings[:options['items']], embeddings[options['items']:]
+
+        ids = np.arange(len(embeddings), dtype=np.int64)
+        self.stdout.write(f"{len(embeddings)} items x {embeddings.shape[1]} dims, "
+                          f"{len(queries)} queries, top-{top_k}")
+
+        baseline = None
+        for method in options['methods'].split(','):
+            started = time.perf_counter()
+            index = MenuIndex.from_embeddings(ids, embeddings, 0, compression=method,
+                                              n_components=options['components'])
+            build_ms = (time.perf_counter() - started) * 1000
+
+            index.search(queries, top_k=top_k)  # warm up
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                results = index.search(queries, top_k=top_k)
+            search_ms = (time.perf_counter() - started) * 1000 / options['repeat']
+
+            ranked = [[item_id for item_id, _ in row] for row in results]
+            if baseline is None:
+                baseline = {'ranked': ranked, 'search_ms': search_ms, 'nbytes': index.nbytes}
+
+            recall = np.mean([
+                len(set(row) & set(base)) / max(len(base), 1)
+                for row, base in zip(ranked, baseline['ranked'])
+            ])
+            top1 = np.mean([
+                bool(row) and bool(base) and row[0] == base[0]
+                for row, base in zip(ranked, baseline['ranked'])
+            ])
+
+            self.stdout.write(
+                f"{index.codec.method:>8}: build {build_ms:8.1f} ms | "
+                f"search {search_ms:8.2f} ms ({baseline['search_ms'] / search_ms:5.2f}x) | "
+                f"memory {index.nbytes / 1e6:8.2f} MB ({100 * (1 - index.nbytes / baseline['nbytes']):5.1f}% saved) | "
+                f"recall@{top_k} {recall:.3f} | top-1 {top1:.3f}"
+            )
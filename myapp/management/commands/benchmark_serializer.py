@@ -0,0 +1,97 @@
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from myapp import serializers
+from myapp.models import Order
+from myapp.serializers import dumps, serialize_orders
+
+
+def legacy_snapshot() -> str:
+    """Per-instance dict building and stdlib json, as the views used to do"""
+    orders = Order.objects.all().order_by('-created_at')
+    return json.dumps([{
+        'id': order.id,
+        'status': order.status,
+        'customer_name': order.customer_name,
+        'created_at': order.created_at.isoformat(),
+        'total_amount': str(order.total_amount),
+        'special_instructions': order.special_instructions,
+        'item_name': order.item_name,
+        'quantity': order.quantity,
+        'item_price': str(order.item_price)
+    } for order in orders])
+
+
+def shared_snapshot() -> str:
+    return dumps(serialize_orders(Order.objects.order_by('-created_at')))
+
+
+class Command(BaseCommand):
+    help = "Time order snapshot serialization: model instances + json vs values_list + fast encoder"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000,
+                            help="Orders to create in a throwaway test database")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def time_it(self, label, func, repeat, baseline=None):
+        func()  # warm up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            output = func()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+        speedup = f" ({baseline / elapsed_ms:4.2f}x)" if baseline else ""
+        self.stdout.write(f"{label:>28}: {elapsed_ms:8.1f} ms{speedup}, {len(output) / 1e6:.2f} MB")
+        return elapsed_ms, output
+
+    def handle(self, *args, **options):
+        # Never write to the live database: a long insert would hold its
+        # write lock and time out webhook orders meanwhile
+        connection = connections[DEFAULT_DB_ALIAS]
+        test_settings = connection.settings_dict['TEST']
+        configured_name, test_settings['NAME'] = test_settings.get('NAME'), None
+        live_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(live_name, verbosity=0)
+            test_settings['NAME'] = configured_name
+
+    def run_benchmark(self, options):
+        now = timezone.now()
+        Order.objects.bulk_create([
+            Order(
+                item_name=f"Benchmark item {i % 50}",
+                item_price=Decimal('12.99'),
+                quantity=i % 4 + 1,
+                total_amount=Decimal('12.99') * (i % 4 + 1),
+                customer_name=f"Caller {i}",
+                special_instructions="extra cheese" if i % 3 else "",
+                created_at=now,
+            ) for i in range(options['orders'])
+        ], batch_size=1000)
+        total = Order.objects.count()
+        self.stdout.write(f"Serializing {total} orders, {options['repeat']} runs each")
+
+        baseline, legacy = self.time_it("model instances + json", legacy_snapshot, options['repeat'])
+
+        fast_backend = serializers.orjson
+        serializers.orjson = None
+        try:
+            _, stdlib = self.time_it("values_list + json", shared_snapshot, options['repeat'], baseline)
+        finally:
+            serializers.orjson = fast_backend
+
+        if json.loads(stdlib) != json.loads(legacy):
+            raise CommandError("values_list + json output differs from the legacy snapshot")
+        if fast_backend is not None:
+            _, fast = self.time_it("values_list + orjson", shared_snapshot, options['repeat'], baseline)
+            if json.loads(fast) != json.loads(legacy):
+                raise CommandError("values_list + orjson output differs from the legacy snapshot")
+        else:
+            self.stdout.write("orjson not installed, skipping fast encoder")
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.reembed import run_reembed
+
+
+class Command(BaseCommand):
+    help = ("Re-embed every menu item with a new embedding model in rate-limited, "
+            "checkpointed batches, then switch search over atomically")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=settings.EMBEDDING_MODEL,
+                            help="Embedding model to switch to")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Items embedded per OpenAI request")
+        parser.add_argument('--rate', type=float, default=60,
+                            help="Maximum embedding requests per minute")
+        parser.add_argument('--no-resume', action='store_true',
+                            help="Start over instead of resuming an unfinished job")
+        parser.add_argument('--no-switch', action='store_true',
+                            help="Only fill the new embedding version, keep serving the old one")
+
+    def handle(self, *args, **options):
+        job = run_reembed(
+            model=options['model'],
+            batch_size=options['batch_size'],
+            per_minute=options['rate'],
+            resume=not options['no_resume'],
+            switch=not options['no_switch'],
+            progress=lambda job: self.stdout.write(
+                f"Job #{job.id}: {job.processed} items embedded (last id {job.last_item_id})"
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Job #{job.id} with {job.model}: {job.status}"))
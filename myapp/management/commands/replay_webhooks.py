@@ -0,0 +1,169 @@
+import difflib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def canonical(value: Any, ignore_numbers: bool) -> str:
+    text = json.dumps(value, indent=2, sort_keys=True) if not isinstance(value, str) else value
+    # Order ids and totals differ between a recording and a fresh database
+    return re.sub(r'\d+', '#', text) if ignore_numbers else text
+
+
+def load_capture(path: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise CommandError(f"{path}:{line_no} is not valid JSON")
+            if limit and len(records) >= limit:
+                break
+    records.sort(key=lambda record: record['captured_at'])
+    return records
+
+
+class Command(BaseCommand):
+    help = ("Replay captured VAPI webhook traffic against a server at recorded speed, "
+            "a multiple of it or as fast as possible, and report latencies and response diffs")
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', nargs='?', default=settings.WEBHOOK_CAPTURE_FILE,
+                            help="JSONL file written by WebhookCaptureMiddleware")
+        parser.add_argument('--target', default=settings.API_BASE_URL,
+                            help="Base URL of the server to replay against")
+        parser.add_argument('--speed', default='1',
+                            help="Time scale: 1 replays at recorded pace, 10 ten times faster, "
+                                 "'max' sends without waiting")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Requests in flight at most")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Replay only the first N captured requests")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--show-diffs', type=int, default=5,
+                            help="Print this many differing responses")
+        parser.add_argument('--ignore-numbers', action='store_true',
+                            help="Ignore digits when comparing responses (ids, totals)")
+
+    def handle(self, *args, **options):
+        if not options['capture']:
+            raise CommandError("No capture file given and WEBHOOK_CAPTURE_FILE is not set")
+        records = load_capture(options['capture'], options['limit'])
+        if not records:
+            raise CommandError(f"{options['capture']} holds no captured requests")
+
+        if options['speed'] == 'max':
+            speed = None
+        else:
+            try:
+                speed = float(options['speed'])
+            except ValueError:
+                raise CommandError("--speed must be a number or 'max'")
+            if speed <= 0:
+                raise CommandError("--speed must be positive")
+
+        target = options['target'].rstrip('/')
+        first = records[0]['captured_at']
+        results: List[Dict[str, Any]] = [{} for _ in records]
+        local = threading.local()
+
+        def send(index: int) -> None:
+            record = records[index]
+            body = record['body']
+            data = body if isinstance(body, str) else json.dumps(body)
+            # Sessions are not thread-safe, give each worker its own
+            http = getattr(local, 'session', None) or requests.Session()
+            local.session = http
+            started = time.perf_counter()
+            try:
+                response = http.request(
+                    record['method'], target + record['path'], data=data.encode('utf-8'),
+                    headers={'Content-Type': record.get('content_type') or 'application/json'},
+                    timeout=options['timeout'],
+                )
+            except requests.RequestException as e:
+                results[index] = {'error': str(e), 'latency_ms': (time.perf_counter() - started) * 1000}
+                return
+            latency_ms = (time.perf_counter() - started) * 1000
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = response.text
+            results[index] = {'status': response.status_code, 'response': payload, 'latency_ms': latency_ms}
+
+        self.stdout.write(f"Replaying {len(records)} requests to {target} at "
+                          f"{'max speed' if speed is None else f'{speed:g}x'}")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for index, record in enumerate(records):
+                if speed is not None:
+                    delay = (record['captured_at'] - first) / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(send, index)
+        wall = time.perf_counter() - started
+
+        self.report(records, results, wall, options)
+
+    def report(self, records, results, wall: float, options) -> None:
+        errors = [r for r in results if 'error' in r]
+        latencies = sorted(r['latency_ms'] for r in results if 'error' not in r)
+        recorded = sorted(record['elapsed_ms'] for record in records)
+
+        self.stdout.write(f"{len(results)} requests in {wall:.2f}s "
+                          f"({len(results) / wall if wall else 0:.1f} req/s), {len(errors)} failed")
+        self.stdout.write(f"{'':>10} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+        for label, values in (('replay', latencies), ('recorded', recorded)):
+            if values:
+                self.stdout.write(f"{label:>10} " + " ".join(
+                    f"{percentile(values, pct):7.1f}ms" for pct in (50, 90, 99, 100)))
+
+        by_path: Dict[str, List[float]] = {}
+        for record, result in zip(records, results):
+            if 'error' not in result:
+                by_path.setdefault(record['path'], []).append(result['latency_ms'])
+        for path, values in sorted(by_path.items()):
+            values.sort()
+            self.stdout.write(f"  {path}: n={len(values)} p50={percentile(values, 50):.1f}ms "
+                              f"p99={percentile(values, 99):.1f}ms")
+
+        status_changes = 0
+        diffs = []
+        for index, (record, result) in enumerate(zip(records, results)):
+            if 'error' in result:
+                continue
+            if result['status'] != record['status']:
+                status_changes += 1
+            expected = canonical(record['response'], options['ignore_numbers'])
+            actual = canonical(result['response'], options['ignore_numbers'])
+            if expected != actual:
+                diffs.append((index, record, expected, actual))
+
+        summary = f"{status_changes} status changes, {len(diffs)} response diffs"
+        self.stdout.write(self.style.SUCCESS(summary) if not status_changes and not diffs
+                          else self.style.WARNING(summary))
+        for index, record, expected, actual in diffs[:options['show_diffs']]:
+            self.stdout.write(f"--- #{index} {record['method']} {record['path']}")
+            for line in difflib.unified_diff(expected.splitlines(), actual.splitlines(),
+                                             'recorded', 'replayed', lineterm=''):
+                self.stdout.write(line)
+        for error in errors[:options['show_diffs']]:
+            self.stderr.write(f"Request failed: {error['error']}")
@@ -0,0 +1,181 @@
+import csv
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from . import embedding_queue
+from .models import MenuAlias, MenuItem
+from .search import invalidate_menu_index
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+MAX_PRICE = Decimal('9999.99')
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(content_type: str, requested: Optional[str] = None) -> str:
+    """Upload format from an explicit ?format= or the Content-Type"""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown format '{requested}', expected one of {IMPORT_FORMATS}")
+        return requested
+    return 'csv' if 'csv' in (content_type or '') else 'ndjson'
+
+
+def iter_rows(lines: Iterable[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, raw row) pairs read from the upload one line at a time"""
+    text = (line.decode('utf-8-sig' if n == 0 else 'utf-8') for n, line in enumerate(lines))
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(f"Invalid JSON: {e}")
+
+
+def validate_row(row: Any) -> Tuple[str, str, Decimal]:
+    """Clean (name, description, price) of one row; raises RowError"""
+    if isinstance(row, RowError):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError("Row must be an object with name, description and price")
+
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise RowError("Missing name")
+    if len(name) > MenuItem._meta.get_field('name').max_length:
+        raise RowError("Name is too long")
+
+    try:
+        price = Decimal(str(row.get('price')).strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise RowError(f"Invalid price: {row.get('price')!r}")
+    if not Decimal('0') <= price <= MAX_PRICE:
+        raise RowError(f"Price out of range: {price}")
+
+    return name, str(row.get('description') or '').strip(), price
+
+
+def write_chunk(chunk: Dict[str, Tuple[str, Decimal]], seen: Optional[Set[int]]) -> Tuple[int, int]:
+    """Create or update one chunk of items by name; returns (created, updated)
+
+    bulk_create/bulk_update skip model signals, so the alias and embedding
+    bookkeeping they would do for edited items is done here.
+    """
+    with transaction.atomic():
+        existing: Dict[str, MenuItem] = {}
+        for item in MenuItem.objects.filter(name__in=list(chunk)).order_by('pk'):
+            existing.setdefault(item.name, item)
+
+        to_create = []
+        to_update = []
+        redescribed = []
+        for name, (description, price) in chunk.items():
+            item = existing.get(name)
+            if item is None:
+                to_create.append(MenuItem(name=name, description=description, price=price))
+                continue
+            if seen is not None:
+                seen.add(item.pk)
+            if item.description != description:
+                item.description = description
+                item.next_embedding = None
+                item.embedding_status = 'pending'
+                redescribed.append(item.pk)
+            elif item.price == price:
+                continue
+            item.price = price
+            to_update.append(item)
+
+        created = MenuItem.objects.bulk_create(to_create)
+        if seen is not None:
+            seen.update(item.pk for item in created)
+        MenuItem.objects.bulk_update(
+            to_update, ['description', 'price', 'next_embedding', 'embedding_status'])
+        if redescribed:
+            # Goes through signals, which drop the phrases from the alias cache
+            MenuAlias.objects.filter(menu_item_id__in=redescribed).delete()
+
+    return len(created), len(to_update)
+
+
+def delete_unseen(seen: Set[int], batch_size: int) -> int:
+    """Delete items that were not part of a replacing upload"""
+    deleted = 0
+    stale: List[int] = []
+    for item_id in MenuItem.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        if item_id not in seen:
+            stale.append(item_id)
+        if len(stale) >= batch_size:
+            deleted += MenuItem.objects.filter(pk__in=stale).delete()[1].get('myapp.MenuItem', 0)
+            stale = []
+    if stale:
+        deleted += MenuItem.objects.filter(pk__in=stale).delete()[1].get('myapp.MenuItem', 0)
+    return deleted
+
+
+def import_menu(lines: Iterable[bytes], fmt: str, replace: bool = False) -> Iterator[Dict[str, Any]]:
+    """Import menu rows in fixed-size chunks, yielding progress and error events
+
+    Only one chunk of rows is held at a time. With `replace`, items missing
+    from the upload are deleted once it has been read without errors.
+    """
+    chunk_size = settings.MENU_IMPORT_CHUNK_SIZE
+    max_errors = settings.MENU_IMPORT_MAX_REPORTED_ERRORS
+    seen: Optional[Set[int]] = set() if replace else None
+    totals = {'rows': 0, 'created': 0, 'updated': 0, 'errors': 0}
+    chunk: Dict[str, Tuple[str, Decimal]] = {}
+
+    def flush() -> Dict[str, Any]:
+        created, updated = write_chunk(chunk, seen)
+        chunk.clear()
+        totals['created'] += created
+        totals['updated'] += updated
+        # Start embedding the first chunks while the rest is still uploading
+        embedding_queue.wake()
+        return {'type': 'progress', **totals}
+
+    try:
+        for line_no, raw in iter_rows(lines, fmt):
+            totals['rows'] += 1
+            try:
+                name, description, price = validate_row(raw)
+            except RowError as e:
+                totals['errors'] += 1
+                if totals['errors'] <= max_errors:
+                    yield {'type': 'error', 'line': line_no, 'message': str(e)}
+                continue
+            # Later rows for the same name win, as with update_or_create
+            chunk[name] = (description, price)
+            if len(chunk) >= chunk_size:
+                yield flush()
+        if chunk:
+            yield flush()
+
+        deleted = 0
+        if replace:
+            if totals['errors']:
+                yield {'type': 'warning', 'message': "Rows were rejected, existing items were kept"}
+            else:
+                deleted = delete_unseen(seen, chunk_size)
+        yield {'type': 'done', 'status': 'success', 'deleted': deleted, **totals}
+    except Exception as e:
+        logger.error("Menu import failed after %s rows: %s", totals['rows'], e)
+        yield {'type': 'done', 'status': 'error', 'message': str(e), **totals}
+    finally:
+        invalidate_menu_index()
@@ -0,0 +1,344 @@
+import cProfile
+import functools
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Set
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+
+from .admission import Rejected, get_gate
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionControlMiddleware:
+    """Limits concurrent requests, admitting webhook traffic before menu and admin traffic
+
+    Requests that cannot get a slot within their class timeout, or whose class
+    queue is full, are answered immediately with a 503. A streaming response
+    keeps its slot until it has been sent, since that is when its work runs.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.ADMISSION_CONTROL['enabled']:
+            return self.get_response(request)
+
+        gate = get_gate()
+        request_class = gate.classify(request.path)
+        try:
+            gate.acquire(request_class)
+        except Rejected:
+            return overloaded_response(request, request_class)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            release_when_sent(gate, request_class, response)
+
+    async def __acall__(self, request):
+        if not settings.ADMISSION_CONTROL['enabled']:
+            return await self.get_response(request)
+
+        gate = get_gate()
+        request_class = gate.classify(request.path)
+        try:
+            await gate.acquire_async(request_class)
+        except Rejected:
+            return overloaded_response(request, request_class)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            release_when_sent(gate, request_class, response)
+
+
+def release_when_sent(gate, request_class: str, response) -> None:
+    """Release now, or once a streaming response is closed after being sent"""
+    if response is None or not response.streaming:
+        gate.release(request_class)
+        return
+    # Both handlers close the response once it has been sent or the client has gone
+    response._resource_closers.append(functools.partial(gate.release, request_class))
+
+
+def overloaded_response(request, request_class: str) -> JsonResponse:
+    """Fast 503; VAPI tool calls get a spoken "please hold" result"""
+    logger.warning("Shed %s request to %s", request_class, request.path)
+    if request.path.startswith('/vapi/'):
+        tool_call_id = "0dca5b3f-59c3-4236-9784-84e560fb26ef"
+        try:
+            received = json.loads(request.body)
+            tool_calls = received.get('message', {}).get('toolCalls') or [received.get('toolCall') or {}]
+            tool_call_id = tool_calls[0].get('id') or tool_call_id
+        except Exception:
+            pass
+        response = JsonResponse({
+            "results": [{
+                "toolCallId": tool_call_id,
+                "result": "Please hold on a moment, we're very busy right now."
+            }]
+        }, status=503)
+    else:
+        response = JsonResponse({
+            'status': 'error',
+            'message': 'Server is busy, please retry shortly'
+        }, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+class ProfilingMiddleware:
+    """Runs selected requests under cProfile and keeps the most recent dumps
+
+    A request is profiled when it carries the `X-Profile` header with the
+    configured PROFILING_TOKEN, or when it is picked by PROFILING_SAMPLE_RATE
+    on one of PROFILING_PATH_PREFIXES. Only one request is profiled at a time.
+    Under ASGI the profile covers the request's sync thread, where the views run.
+    """
+
+    header = 'HTTP_X_PROFILE'
+    _busy = threading.Lock()
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def should_profile(self, request) -> bool:
+        # The token also authorizes reading profiles; profiling those reads
+        # would push real dumps out of the retention window
+        if request.path.startswith(reverse('myapp:list_profiles')):
+            return False
+        token = settings.PROFILING_TOKEN
+        if token and request.META.get(self.header) == token:
+            return True
+        rate = settings.PROFILING_SAMPLE_RATE
+        return (
+            rate > 0
+            and request.path.startswith(tuple(settings.PROFILING_PATH_PREFIXES))
+            and random.random() < rate
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_profile(request) or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            self._busy.release()
+        return self.finish(profiler, request, response, started)
+
+    async def __acall__(self, request):
+        if not self.should_profile(request) or not self._busy.acquire(blocking=False):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            # cProfile only sees the thread it is enabled in; the ASGI handler
+            # runs all sync code of one request in the same thread
+            await sync_to_async(profiler.enable)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(profiler.disable)()
+        finally:
+            self._busy.release()
+        return await sync_to_async(self.finish)(profiler, request, response, started)
+
+    def finish(self, profiler: cProfile.Profile, request, response, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            name = save_profile(profiler, request.path, elapsed_ms)
+            response['X-Profile-Id'] = name
+        except Exception as e:
+            logger.error("Failed to save profile: %s", e)
+        return response
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def save_profile(profiler: cProfile.Profile, path: str, elapsed_ms: float) -> str:
+    """Dump a profile to the retention directory and prune the oldest ones"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    slug = path.strip('/').replace('/', '-') or 'root'
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{int(elapsed_ms)}ms-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(directory / name)
+    logger.info("Saved profile %s for %s (%.1f ms)", name, path, elapsed_ms)
+
+    profiles = sorted(directory.glob('*.prof'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[settings.PROFILING_MAX_FILES:]:
+        old.unlink(missing_ok=True)
+    return name
+
+
+class WebhookCaptureMiddleware:
+    """Appends sanitized VAPI webhook traffic to WEBHOOK_CAPTURE_FILE
+
+    Each line holds the request body, the response and the server-side
+    timing of one call, for `manage.py replay_webhooks`. Values under
+    WEBHOOK_CAPTURE_REDACT_KEYS are masked before anything is written.
+    """
+
+    _write_lock = threading.Lock()
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def should_capture(request) -> bool:
+        return bool(settings.WEBHOOK_CAPTURE_FILE) and request.path.startswith(
+            tuple(settings.WEBHOOK_CAPTURE_PATH_PREFIXES))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_capture(request):
+            return self.get_response(request)
+
+        # Read the body before the view does, it cannot be read after a stream read
+        body = request.body
+        captured_at = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.capture(request, body, response, captured_at, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_capture(request):
+            return await self.get_response(request)
+
+        body = request.body
+        captured_at = time.time()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(self.capture)(
+            request, body, response, captured_at, (time.perf_counter() - started) * 1000)
+        return response
+
+    def capture(self, request, body: bytes, response, captured_at: float, elapsed_ms: float) -> None:
+        try:
+            secrets: Set[str] = set()
+            capture_webhook({
+                'captured_at': captured_at,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'content_type': request.content_type,
+                'body': sanitize_payload(decode_body(body), secrets),
+                'status': response.status_code,
+                'response': sanitize_payload(
+                    decode_body(b'' if response.streaming else response.content), secrets),
+                'elapsed_ms': round(elapsed_ms, 3),
+            })
+        except Exception as e:
+            logger.error("Failed to capture webhook: %s", e)
+
+
+def decode_body(body: bytes):
+    """JSON bodies as data, anything else as text"""
+    text = body.decode('utf-8', errors='replace')
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def sanitize_payload(value, secrets: Optional[Set[str]] = None):
+    """Copy of a JSON value with personal data and secrets masked
+
+    Masked strings are added to `secrets` and also scrubbed wherever they
+    appear inside other strings, e.g. a caller's name echoed in a reply.
+    Tool call `arguments` sent as a JSON string are masked inside that string.
+    """
+    redact = {key.lower() for key in settings.WEBHOOK_CAPTURE_REDACT_KEYS}
+    secrets = set() if secrets is None else secrets
+
+    def mask(item):
+        if isinstance(item, dict):
+            cleaned = {}
+            for key, item_value in item.items():
+                if key.lower() in redact and item_value not in (None, ''):
+                    if isinstance(item_value, str) and len(item_value) > 2:
+                        secrets.add(item_value)
+                    cleaned[key] = '[redacted]'
+                elif key == 'arguments' and isinstance(item_value, str):
+                    cleaned[key] = mask_encoded(item_value)
+                else:
+                    cleaned[key] = mask(item_value)
+            return cleaned
+        if isinstance(item, list):
+            return [mask(entry) for entry in item]
+        return item
+
+    def mask_encoded(text):
+        try:
+            decoded = json.loads(text)
+        except ValueError:
+            return text
+        if not isinstance(decoded, (dict, list)):
+            return text
+        # Re-encoded so a replay sends the same shape VAPI did
+        return json.dumps(mask(decoded))
+
+    def scrub(item):
+        if isinstance(item, dict):
+            return {key: scrub(item_value) for key, item_value in item.items()}
+        if isinstance(item, list):
+            return [scrub(entry) for entry in item]
+        if isinstance(item, str):
+            for secret in secrets:
+                item = item.replace(secret, '[redacted]')
+        return item
+
+    return scrub(mask(value))
+
+
+def capture_webhook(record: dict) -> None:
+    path = Path(settings.WEBHOOK_CAPTURE_FILE)
+    line = json.dumps(record, default=str) + '\n'
+    with WebhookCaptureMiddleware._write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('a', encoding='utf-8') as f:
+            f.write(line)
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('customer_name', models.CharField(blank=True, max_length=200)),
+                ('special_instructions', models.TextField(blank=True)),
+                ('item_name', models.CharField(max_length=200)),
+                ('item_price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='myapp_order_created_2b4d17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'updated_at'], name='myapp_order_status_b89bbd_idx'),
+        ),
+    ]
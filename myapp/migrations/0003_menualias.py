@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=200, unique=True)),
+                ('source', models.CharField(choices=[('order', 'Confirmed order'), ('admin', 'Admin')], default='order', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='myapp.menuitem')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:02
+
+from django.db import migrations, models
+
+
+def mark_embedded_items_ready(apps, schema_editor):
+    MenuItem = apps.get_model('myapp', 'MenuItem')
+    MenuItem.objects.filter(embedding__isnull=False).update(embedding_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_reembed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='embedding_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='embedding_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_embedded_items_ready, migrations.RunPython.noop),
+    ]
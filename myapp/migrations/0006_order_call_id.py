@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_embedding_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='call_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
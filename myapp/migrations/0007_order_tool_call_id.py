@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_order_call_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='tool_call_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -5,23 +5,40 @@ from numpy.typing import NDArray
 from django.utils import timezone
 
 class MenuItem(models.Model):
+    EMBEDDING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     name: str = models.CharField(max_length=200)
     description: str = models.TextField(blank=True)
     price: float = models.DecimalField(max_digits=6, decimal_places=2)
     embedding = models.JSONField(null=True)  # Store embedding as JSON
+    embedding_model = models.CharField(max_length=100, blank=True)
+    # Written by a re-embedding job until it switches over to the new model
+    next_embedding = models.JSONField(null=True)
+    # Items wait in the background embedding queue until their vector is ready
+    embedding_status = models.CharField(max_length=20, choices=EMBEDDING_STATUS_CHOICES,
+                                        default='pending', db_index=True)
+    embedding_error = models.TextField(blank=True)
 
     def __str__(self):
         return f"{self.name} - ${self.price}"
 
-    def set_embedding(self, embedding_array: NDArray) -> None:
+    def set_embedding(self, embedding_array: NDArray, model: str = '') -> None:
         """Store numpy array as list"""
         self.embedding = embedding_array.tolist()
+        self.embedding_model = model
+        self.embedding_status = 'ready'
+        self.embedding_error = ''
 
     def get_embedding(self) -> Optional[NDArray]:
         """Get embedding as numpy array"""
         return np.array(self.embedding) if self.embedding else None 
 
-class Order(models.Model):
+class BaseOrder(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
@@ -30,6 +47,7 @@ class Order(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    TERMINAL_STATUSES = ['completed', 'cancelled']
 
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -41,9 +59,66 @@ class Order(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return f"Order #{self.id} - {self.quantity}x {self.item_name} - {self.status}"
 
+class Order(BaseOrder):
+    # VAPI call that placed the order, used to scope voice removals to the caller
+    call_id = models.CharField(max_length=100, blank=True, db_index=True)
+    # VAPI tool call that created the order; retries of the same call reuse it
+    tool_call_id = models.CharField(max_length=100, null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_amount = self.item_price * self.quantity
-        super().save(*args, **kwargs) 
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class ArchivedOrder(BaseOrder):
+    """Cold storage for orders moved out of the hot Order table"""
+    # Keep the original order id so archived orders stay addressable
+    id = models.BigIntegerField(primary_key=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+class MenuAlias(models.Model):
+    """A spoken phrase that is known to resolve to a menu item"""
+    SOURCE_CHOICES = [
+        ('order', 'Confirmed order'),
+        ('admin', 'Admin'),
+    ]
+
+    phrase = models.CharField(max_length=200, unique=True)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='aliases')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='order')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"'{self.phrase}' -> {self.menu_item.name}"
+
+class ReembedJob(models.Model):
+    """Checkpoint for a background re-embedding of the whole menu"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+
+    model = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    last_item_id = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Re-embed #{self.id} with {self.model} - {self.status}"
@@ -0,0 +1,153 @@
+import logging
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from django.db.models import Q
+
+from .aliases import normalize_phrase
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+
+def item_tokens(text: str) -> FrozenSet[str]:
+    """Normalized item-name words, with simple plurals folded ("pizzas" -> "pizza")"""
+    tokens = set()
+    for word in normalize_phrase(text).split():
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.add(word)
+    return frozenset(tokens)
+
+
+def caller_keys(call_id: str = '', customer_name: str = '') -> List[str]:
+    """Index keys identifying a caller, most specific first"""
+    keys = []
+    if call_id:
+        keys.append(f"call:{call_id}")
+    customer = normalize_phrase(customer_name or '')
+    if customer:
+        keys.append(f"customer:{customer}")
+    return keys
+
+
+class ActiveOrderIndex:
+    """In-memory index of non-terminal orders, keyed by caller
+
+    Loaded lazily from the database the first time it is used, then kept
+    current by this process's Order save/delete signals. Orders written by
+    other processes are not seen until a caller's entries are refreshed, which
+    find() does whenever it has no match for that caller.
+    """
+
+    def __init__(self):
+        # key -> order id -> (created_at, item tokens)
+        self._by_key: Dict[str, Dict[int, Tuple[object, FrozenSet[str]]]] = {}
+        self._keys_by_order: Dict[int, List[str]] = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        active = (Order.objects.exclude(status__in=Order.TERMINAL_STATUSES)
+                  .values_list('id', 'call_id', 'customer_name', 'item_name', 'created_at'))
+        for order_id, call_id, customer_name, item_name, created_at in active:
+            self._add(order_id, call_id, customer_name, item_name, created_at)
+        self._loaded = True
+        logger.info("Loaded %s active orders into the order index", len(self._keys_by_order))
+
+    def _add(self, order_id, call_id, customer_name, item_name, created_at) -> None:
+        self._discard(order_id)
+        keys = caller_keys(call_id, customer_name)
+        if not keys:
+            return
+        entry = (created_at, item_tokens(item_name))
+        for key in keys:
+            self._by_key.setdefault(key, {})[order_id] = entry
+        self._keys_by_order[order_id] = keys
+
+    def _discard(self, order_id: int) -> None:
+        for key in self._keys_by_order.pop(order_id, []):
+            orders = self._by_key.get(key)
+            if orders is not None:
+                orders.pop(order_id, None)
+                if not orders:
+                    del self._by_key[key]
+
+    def update(self, order: Order) -> None:
+        """Index an order, or drop it once it reaches a terminal status"""
+        with self._lock:
+            if not self._loaded:
+                return
+            if order.status in Order.TERMINAL_STATUSES:
+                self._discard(order.id)
+            else:
+                self._add(order.id, order.call_id, order.customer_name, order.item_name, order.created_at)
+
+    def discard(self, order_id: int) -> None:
+        with self._lock:
+            self._discard(order_id)
+
+    def reset(self) -> None:
+        """Forget everything; the index reloads on next use"""
+        with self._lock:
+            self._by_key.clear()
+            self._keys_by_order.clear()
+            self._loaded = False
+
+    def refresh_caller(self, call_id: str = '', customer_name: str = '') -> None:
+        """Replace one caller's entries with their active orders in the database"""
+        lookup = Q()
+        if call_id:
+            lookup |= Q(call_id=call_id)
+        if customer_name.strip():
+            lookup |= Q(customer_name__iexact=customer_name.strip())
+        if not lookup:
+            return
+        active = list(Order.objects.filter(lookup).exclude(status__in=Order.TERMINAL_STATUSES)
+                      .values_list('id', 'call_id', 'customer_name', 'item_name', 'created_at'))
+        with self._lock:
+            self._ensure_loaded()
+            for key in caller_keys(call_id, customer_name):
+                for order_id in list(self._by_key.get(key, {})):
+                    self._discard(order_id)
+            for row in active:
+                self._add(*row)
+
+    def _match(self, wanted: Set[str], call_id: str, customer_name: str) -> Optional[int]:
+        for key in caller_keys(call_id, customer_name):
+            orders = self._by_key.get(key)
+            if not orders:
+                continue
+            best = max(
+                orders.items(),
+                key=lambda entry: (len(wanted & entry[1][1]), entry[1][0], entry[0])
+            )
+            if wanted & best[1][1]:
+                return best[0]
+        return None
+
+    def find(self, phrase: str, call_id: str = '', customer_name: str = '',
+             refresh: bool = False) -> Optional[int]:
+        """Most recent active order of this caller whose item best matches the phrase
+
+        Without a match in memory, or with `refresh`, the caller's orders are
+        re-read from the database first: another worker may have placed them.
+        """
+        wanted: Set[str] = set(item_tokens(phrase))
+        if not wanted:
+            return None
+
+        if not refresh:
+            with self._lock:
+                self._ensure_loaded()
+                found = self._match(wanted, call_id, customer_name)
+            if found is not None:
+                return found
+        self.refresh_caller(call_id, customer_name)
+        with self._lock:
+            return self._match(wanted, call_id, customer_name)
+
+
+active_orders = ActiveOrderIndex()
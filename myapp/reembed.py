@@ -0,0 +1,149 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MenuItem, ReembedJob
+from .search import invalidate_menu_index
+from .utils import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces out calls so no more than `per_minute` happen in any minute"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.next_at = 0.0
+
+    def wait(self) -> None:
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def _embed_with_retry(texts, model: str, retries: int = 3):
+    delay = 1.0
+    for attempt in range(retries + 1):
+        try:
+            return get_embeddings(texts, model=model)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logger.warning("Embedding batch failed (%s), retrying in %.0fs", e, delay)
+            time.sleep(delay)
+            delay *= 2
+
+
+def _embed_batch(items, model: str, limiter: RateLimiter, field: str):
+    """Embed a batch of (id, name, description) rows and store the vectors in `field`"""
+    limiter.wait()
+    vectors = _embed_with_retry([f"{name} {description}" for _, name, description in items], model)
+    with transaction.atomic():
+        for (item_id, _, _), vector in zip(items, vectors):
+            updates = {field: vector.tolist()}
+            if field == 'embedding':
+                updates['embedding_model'] = model
+            MenuItem.objects.filter(pk=item_id).update(**updates)
+
+
+def start_or_resume_job(model: str, resume: bool = True) -> ReembedJob:
+    """Pick up the latest unfinished job for this model, or start a new one"""
+    if resume:
+        job = ReembedJob.objects.filter(model=model, status__in=['running', 'failed']).order_by('-created_at').first()
+        if job:
+            logger.info("Resuming re-embed job #%s after item %s", job.id, job.last_item_id)
+            job.status = 'running'
+            job.error = ''
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            return job
+
+    ReembedJob.objects.filter(status='running').update(status='failed', error='Superseded by a new job')
+    # Vectors from abandoned jobs may belong to another model
+    MenuItem.objects.filter(next_embedding__isnull=False).update(next_embedding=None)
+    return ReembedJob.objects.create(model=model)
+
+
+def run_reembed(
+    model: str,
+    batch_size: int = 100,
+    per_minute: float = 60,
+    resume: bool = True,
+    switch: bool = True,
+    progress: Optional[Callable[[ReembedJob], None]] = None,
+) -> ReembedJob:
+    """Re-embed the menu into next_embedding, checkpointing each batch, then switch over"""
+    job = start_or_resume_job(model, resume=resume)
+    limiter = RateLimiter(per_minute)
+
+    try:
+        while True:
+            batch = list(
+                MenuItem.objects.filter(pk__gt=job.last_item_id)
+                .order_by('pk')
+                .values_list('id', 'name', 'description')[:batch_size]
+            )
+            if not batch:
+                break
+
+            _embed_batch(batch, model, limiter, 'next_embedding')
+            job.last_item_id = batch[-1][0]
+            job.processed += len(batch)
+            job.save(update_fields=['last_item_id', 'processed', 'updated_at'])
+            if progress:
+                progress(job)
+
+        # Items edited while the job ran had their next_embedding cleared
+        while True:
+            stale = list(
+                MenuItem.objects.filter(next_embedding__isnull=True)
+                .order_by('pk')
+                .values_list('id', 'name', 'description')[:batch_size]
+            )
+            if not stale:
+                break
+            _embed_batch(stale, model, limiter, 'next_embedding')
+    except Exception as e:
+        logger.error("Re-embed job #%s failed: %s", job.id, e)
+        job.status = 'failed'
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    if switch:
+        switch_embeddings(job)
+        # Items written between the sweep and the switch still use the old model
+        while True:
+            leftover = list(
+                MenuItem.objects.exclude(embedding_model=model)
+                .order_by('pk')
+                .values_list('id', 'name', 'description')[:batch_size]
+            )
+            if not leftover:
+                break
+            _embed_batch(leftover, model, limiter, 'embedding')
+        transaction.on_commit(invalidate_menu_index)
+    return job
+
+
+def switch_embeddings(job: ReembedJob) -> None:
+    """Atomically promote next_embedding to the live embedding column"""
+    with transaction.atomic():
+        MenuItem.objects.filter(next_embedding__isnull=False).update(
+            embedding=F('next_embedding'),
+            next_embedding=None,
+            embedding_model=job.model
+        )
+        job.status = 'complete'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at', 'updated_at'])
+
+        transaction.on_commit(invalidate_menu_index)
+
+    logger.info("Switched menu embeddings to %s (job #%s)", job.model, job.id)
@@ -0,0 +1,238 @@
+import atexit
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import index_store
+from .compression import EmbeddingCodec
+from .models import MenuItem, ReembedJob
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever a menu item is created, changed or deleted
+_menu_version = 0
+_version_lock = threading.Lock()
+_index_lock = threading.Lock()
+_index: Optional["MenuIndex"] = None
+_publish_timer: Optional[threading.Timer] = None
+
+
+class MenuIndex:
+    """Row-normalized (optionally compressed) embedding matrix for the whole menu"""
+
+    def __init__(
+        self,
+        ids: NDArray,
+        matrix: NDArray,
+        version: int,
+        codec: Optional[EmbeddingCodec] = None,
+        model: str = '',
+        source: str = '',
+    ):
+        self.ids = ids
+        self.matrix = matrix
+        self.version = version
+        self.codec = codec or EmbeddingCodec()
+        # Embedding model the rows were produced with; queries must use the same one
+        self.model = model
+        # Published version this index was written to or mapped from, if shared
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, version: int) -> "MenuIndex":
+        """Load every stored embedding of the active model into a single matrix"""
+        model = get_active_embedding_model()
+        ids = []
+        rows = []
+        # Rows left over from another model would have a different dimension;
+        # unlabeled rows predate model tracking
+        items = MenuItem.objects.filter(embedding__isnull=False).filter(
+            Q(embedding_model=model) | Q(embedding_model=''))
+        for item_id, embedding in items.values_list('id', 'embedding'):
+            if embedding:
+                ids.append(item_id)
+                rows.append(embedding)
+
+        if not rows:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), version, model=model)
+
+        return cls.from_embeddings(np.asarray(ids, dtype=np.int64), np.asarray(rows, dtype=np.float32),
+                                   version, model=model)
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        ids: NDArray,
+        embeddings: NDArray,
+        version: int,
+        compression: Optional[str] = None,
+        n_components: Optional[int] = None,
+        model: str = '',
+    ) -> "MenuIndex":
+        """Normalize and compress raw embeddings into an index"""
+        codec = EmbeddingCodec(
+            compression or settings.EMBEDDING_COMPRESSION,
+            n_components or settings.EMBEDDING_PCA_COMPONENTS,
+        )
+        matrix = codec.encode(normalize_rows(embeddings))
+        return cls(ids, matrix, version, codec, model=model)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codec.nbytes(self.matrix) + self.ids.nbytes
+
+    def search(
+        self,
+        query_vectors: NDArray,
+        top_k: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> List[List[Tuple[int, float]]]:
+        """Score all queries at once and return (item_id, score) pairs per query, best first"""
+        if len(self) == 0:
+            return [[] for _ in range(len(query_vectors))]
+
+        queries = self.codec.encode_queries(normalize_rows(np.asarray(query_vectors, dtype=np.float32)))
+        scores = self.codec.scores(queries, self.matrix)
+
+        n_items = scores.shape[1]
+        k = n_items if top_k is None else min(top_k, n_items)
+        if k <= 0:
+            return [[] for _ in range(len(scores))]
+
+        # Partial selection of the k best columns, then sort only those
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n_items else None
+
+        results = []
+        for i, row in enumerate(scores):
+            cols = candidates[i] if candidates is not None else np.arange(n_items)
+            cols = cols[row[cols] >= min_score]
+            cols = cols[np.argsort(-row[cols], kind='stable')]
+            results.append([(int(self.ids[col]), float(row[col])) for col in cols])
+        return results
+
+
+def normalize_rows(matrix: NDArray) -> NDArray:
+    """Scale each row to unit length so dot products are cosine similarities"""
+    matrix = np.atleast_2d(matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def get_menu_version() -> int:
+    """Current menu version"""
+    return _menu_version
+
+
+def invalidate_menu_index() -> None:
+    """Mark the cached menu index as stale"""
+    global _menu_version
+    with _version_lock:
+        _menu_version += 1
+    if index_store.store_dir() is not None:
+        schedule_publish()
+
+
+def get_menu_index() -> MenuIndex:
+    """Get the menu index, rebuilding it only when the menu changed
+
+    With MENU_INDEX_DIR set, a rebuilt index is published for the other
+    workers, and versions published by them are memory-mapped instead of
+    being rebuilt from the database. A re-embedding job switches models in
+    its own process, so the active model is read from the database on every
+    call and an index of another model is rebuilt.
+    """
+    global _index
+    with _index_lock:
+        version = _menu_version
+        shared = index_store.store_dir() is not None
+        model = get_active_embedding_model()
+
+        if _index is not None and _index.version == version and _index.model == model:
+            if shared:
+                current = index_store.current_version()
+                if current and current != _index.source:
+                    loaded = load_shared_index(current, version)
+                    if loaded is not None and loaded.model == model:
+                        _index = loaded
+            return _index
+
+        if shared and _index is None and version == 0:
+            # First use in this worker, with no local changes: map what the others already built
+            current = index_store.current_version()
+            loaded = load_shared_index(current, version) if current else None
+            if loaded is not None and loaded.model == model:
+                _index = loaded
+                return _index
+
+        built_at = time.time_ns()
+        _index = MenuIndex.build(version)
+        logger.info("Built %s menu index with %s items (version %s)",
+                    _index.codec.method, len(_index), version)
+        if shared:
+            try:
+                _index.source = index_store.publish(
+                    _index.ids, _index.matrix, _index.codec, _index.model, built_at)
+            except OSError as e:
+                logger.error("Failed to publish menu index: %s", e)
+        return _index
+
+
+def load_shared_index(name: str, version: int) -> Optional[MenuIndex]:
+    loaded = index_store.load(name)
+    if loaded is None:
+        return None
+    ids, matrix, codec, model = loaded
+    logger.info("Mapped shared %s menu index %s with %s items", codec.method, name, len(ids))
+    return MenuIndex(ids, matrix, version, codec, model=model, source=name)
+
+
+def schedule_publish() -> None:
+    """Rebuild and publish shortly after a change, once for a burst of changes"""
+    global _publish_timer
+    with _version_lock:
+        if _publish_timer is not None:
+            return
+        _publish_timer = threading.Timer(settings.MENU_INDEX_PUBLISH_DELAY, publish_now)
+        _publish_timer.daemon = True
+        _publish_timer.start()
+
+
+@atexit.register
+def publish_now() -> None:
+    """Publish a pending menu change; also run at exit so commands don't lose one"""
+    global _publish_timer
+    with _version_lock:
+        if _publish_timer is None:
+            return
+        _publish_timer.cancel()
+        _publish_timer = None
+
+    from django.db import connection
+    try:
+        get_menu_index()
+    except Exception as e:
+        logger.error("Failed to publish menu index: %s", e)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def get_active_embedding_model() -> str:
+    """Embedding model the live menu embeddings were produced with
+
+    Not cached: the switch happens in whichever process ran the job.
+    """
+    model = (ReembedJob.objects.filter(status='complete')
+             .order_by('-finished_at').values_list('model', flat=True).first())
+    return model or settings.EMBEDDING_MODEL
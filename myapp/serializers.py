@@ -0,0 +1,59 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db.models import QuerySet
+from django.http import HttpResponse
+
+# orjson is optional; it encodes large order lists several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORDER_FIELDS = (
+    'id', 'status', 'customer_name', 'created_at', 'total_amount',
+    'special_instructions', 'item_name', 'quantity', 'item_price',
+)
+
+
+def serialize_order_rows(rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """Format ORDER_FIELDS value tuples into API dicts"""
+    return [{
+        'id': order_id,
+        'status': status,
+        'customer_name': customer_name,
+        'created_at': created_at.isoformat(),
+        'total_amount': str(total_amount),
+        'special_instructions': special_instructions,
+        'item_name': item_name,
+        'quantity': quantity,
+        'item_price': str(item_price)
+    } for (order_id, status, customer_name, created_at, total_amount,
+           special_instructions, item_name, quantity, item_price) in rows]
+
+
+def serialize_orders(queryset: QuerySet) -> List[Dict[str, Any]]:
+    """Serialize orders straight from database rows, without model instances"""
+    return serialize_order_rows(queryset.values_list(*ORDER_FIELDS))
+
+
+def serialize_order(queryset: QuerySet) -> Optional[Dict[str, Any]]:
+    """Serialize the first matching order, or None"""
+    row = queryset.values_list(*ORDER_FIELDS).first()
+    return serialize_order_rows([row])[0] if row else None
+
+
+def dumps(data: Any) -> str:
+    """Encode JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+
+def json_response(data: Any, status: int = 200) -> HttpResponse:
+    """JsonResponse equivalent that uses the fast encoder"""
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data)
+    return HttpResponse(body, status=status, content_type='application/json')
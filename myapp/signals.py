@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .broadcast import invalidate_orders_snapshot
+from .aliases import cache_alias, uncache_alias
+from .models import MenuAlias, MenuItem, Order
+from .order_index import active_orders
+from .search import invalidate_menu_index
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Invalidate the cached orders snapshot once the change is committed"""
+    transaction.on_commit(invalidate_orders_snapshot)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: active_orders.update(instance))
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    order_id = instance.pk
+    transaction.on_commit(lambda: active_orders.discard(order_id))
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def menu_item_changed(sender, instance, **kwargs):
+    """Invalidate the cached menu index once the change is committed"""
+    transaction.on_commit(invalidate_menu_index)
+
+
+@receiver(pre_save, sender=MenuItem)
+def menu_item_text_changed(sender, instance, **kwargs):
+    """Forget aliases and queue a new embedding when an item is renamed or redescribed"""
+    if instance.pk is None:
+        return
+    old = MenuItem.objects.filter(pk=instance.pk).values_list('name', 'description').first()
+    if old and old != (instance.name, instance.description):
+        MenuAlias.objects.filter(menu_item_id=instance.pk).delete()
+        # A vector queued by a running re-embed job no longer matches the text
+        instance.next_embedding = None
+        instance.embedding_status = 'pending'
+
+
+@receiver(post_save, sender=MenuItem)
+def menu_item_needs_embedding(sender, instance, **kwargs):
+    """Wake the background embedding workers for new or edited items"""
+    if instance.embedding_status == 'pending':
+        from . import embedding_queue
+        transaction.on_commit(embedding_queue.wake)
+
+
+@receiver(post_save, sender=MenuAlias)
+def alias_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: cache_alias(instance.phrase, instance.menu_item_id))
+
+
+@receiver(post_delete, sender=MenuAlias)
+def alias_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: uncache_alias(instance.phrase))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from myapp.archive import archive_orders
+from myapp.models import ArchivedOrder, Order
+from myapp.tests.utils import make_orders, orders_inserted_meanwhile
+
+
+def make_old_orders(count):
+    make_orders(count, status='completed')
+    Order.objects.update(updated_at=timezone.now() - timedelta(days=2))
+
+
+class ArchiveOrdersTests(TransactionTestCase):
+
+    def test_archive_while_orders_are_inserted(self):
+        make_old_orders(3000)
+        with orders_inserted_meanwhile() as (_, errors):
+            moved = archive_orders(terminal_after_hours=1, batch_size=500)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(moved, 3000)
+        self.assertFalse(Order.objects.filter(item_name='Pizza').exists())
+        self.assertEqual(ArchivedOrder.objects.count(), 3000)
+
+    def test_order_whose_id_is_taken_in_archive_is_kept(self):
+        make_old_orders(3)
+        taken = Order.objects.order_by('pk').first()
+        ArchivedOrder.objects.create(
+            id=taken.pk, created_at=taken.created_at - timedelta(days=30), updated_at=taken.updated_at,
+            item_name='Older order', item_price=1, quantity=1, total_amount=1,
+        )
+
+        self.assertEqual(archive_orders(terminal_after_hours=1, batch_size=2), 2)
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [taken.pk])
+        self.assertEqual(ArchivedOrder.objects.get(pk=taken.pk).item_name, 'Older order')
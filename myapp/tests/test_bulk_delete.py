@@ -0,0 +1,42 @@
+from django.test import TransactionTestCase
+
+from myapp import bulk_delete
+from myapp.models import MenuAlias, MenuItem, Order
+from myapp.tests.utils import make_orders, orders_inserted_meanwhile
+
+
+class DeleteInChunksTests(TransactionTestCase):
+
+    def test_clear_orders_while_orders_are_inserted(self):
+        make_orders(20000)
+        with orders_inserted_meanwhile() as (inserted, errors):
+            deleted = bulk_delete.delete_in_chunks(
+                Order.objects.filter(item_name='Pizza'), batch_size=500)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(deleted, 20000)
+        self.assertFalse(Order.objects.filter(item_name='Pizza').exists())
+        self.assertEqual(Order.objects.filter(item_name='Live').count(), len(inserted))
+
+    def test_rows_added_after_start_are_kept(self):
+        make_orders(5)
+        progress = []
+
+        def add_order(total):
+            progress.append(total)
+            if len(progress) == 1:
+                make_orders(1, customer_name='late')
+
+        deleted = bulk_delete.delete_in_chunks(Order.objects.all(), batch_size=2, progress=add_order)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(list(Order.objects.values_list('customer_name', flat=True)), ['late'])
+
+    def test_clear_menu_deletes_aliases_first(self):
+        items = MenuItem.objects.bulk_create([MenuItem(name=f'Item {i}', price=1) for i in range(5)])
+        MenuAlias.objects.bulk_create([MenuAlias(phrase=f'alias {i}', menu_item=item) for i, item in enumerate(items)])
+
+        self.assertEqual(bulk_delete.clear_menu(), 5)
+        self.assertFalse(MenuItem.objects.exists())
+        self.assertFalse(MenuAlias.objects.exists())
@@ -0,0 +1,51 @@
+import json
+
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from myapp import broadcast
+from myapp.broadcast import OrderFilter, get_orders_snapshot
+from myapp.consumers import OrderConsumer
+from myapp.models import Order
+from myapp.tests.utils import make_orders
+
+
+class OrderConsumerTests(TransactionTestCase):
+
+    async def test_non_object_messages_keep_the_connection(self):
+        communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), '/ws/orders/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], 'orders_update')
+
+        for text in ('[]', '"x"', '3'):
+            await communicator.send_to(text_data=text)
+            self.assertEqual(json.loads(await communicator.receive_from()),
+                             {'type': 'error', 'message': 'Message must be a JSON object'})
+
+        await communicator.send_to(text_data=json.dumps({'type': 'subscribe', 'statuses': ['pending']}))
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], 'orders_update')
+        await communicator.disconnect()
+
+
+class OrdersSnapshotTests(TestCase):
+
+    def setUp(self):
+        broadcast._snapshots.clear()
+        self.addCleanup(broadcast._snapshots.clear)
+
+    @override_settings(ORDERS_SNAPSHOT_CACHE_MAX=3)
+    def test_snapshot_cache_is_bounded(self):
+        for n in range(10):
+            get_orders_snapshot(OrderFilter(items=frozenset([f'item {n}'])))
+        self.assertEqual(len(broadcast._snapshots), 3)
+        self.assertEqual(list(broadcast._snapshots), ['|item 7|', '|item 8|', '|item 9|'])
+
+    def test_snapshot_sees_orders_written_by_other_processes(self):
+        self.assertEqual(json.loads(get_orders_snapshot())['orders'], [])
+        # No signal fires in this process, as for another worker or archive_orders
+        order, = make_orders(1)
+        self.assertEqual([row['id'] for row in json.loads(get_orders_snapshot())['orders']], [order.id])
+
+        Order.objects.filter(pk=order.pk)._raw_delete(Order.objects.db)
+        self.assertEqual(json.loads(get_orders_snapshot())['orders'], [])
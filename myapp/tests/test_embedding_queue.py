@@ -0,0 +1,26 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TransactionTestCase
+
+from myapp import embedding_queue
+from myapp.models import MenuItem
+
+
+class DrainTests(TransactionTestCase):
+
+    def test_claimed_rows_are_released_when_the_worker_dies(self):
+        # bulk_create sends no signals, so no background worker picks the item up
+        item, = MenuItem.objects.bulk_create([MenuItem(name='Pizza', price=10, embedding_status='pending')])
+
+        # The embedding call succeeds, then the database fails before the rows are written
+        with mock.patch.object(embedding_queue, 'get_embeddings', return_value=np.ones((1, 3))), \
+                mock.patch.object(embedding_queue, 'get_active_embedding_model',
+                                  side_effect=['model', RuntimeError('database is gone')]), \
+                mock.patch.object(embedding_queue, '_running', 1):
+            embedding_queue._drain()
+            self.assertEqual(embedding_queue._running, 0)
+
+        item.refresh_from_db()
+        self.assertEqual(item.embedding_status, 'failed')
+        self.assertEqual(item.embedding_error, 'database is gone')
@@ -0,0 +1,91 @@
+import tempfile
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from myapp import index_store, search
+from myapp.compression import EmbeddingCodec
+from myapp.models import MenuItem
+
+
+class SharedIndexTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(MENU_INDEX_DIR=directory.name, MENU_INDEX_KEEP_VERSIONS=2,
+                                     EMBEDDING_MODEL='model-a', EMBEDDING_COMPRESSION='none')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.directory = index_store.store_dir()
+
+    def publish(self, built_at, ids=(1, 2), model='model-a'):
+        ids = np.asarray(ids, dtype=np.int64)
+        matrix = np.eye(len(ids), 4, dtype=np.float32)
+        return index_store.publish(ids, matrix, EmbeddingCodec('none'), model, built_at)
+
+
+class IndexStoreTests(SharedIndexTestCase):
+
+    def test_publish_and_load(self):
+        name = self.publish(1)
+        self.assertEqual(index_store.current_version(), name)
+        ids, matrix, codec, model = index_store.load(name)
+        self.assertEqual(list(ids), [1, 2])
+        np.testing.assert_array_equal(matrix, np.eye(2, 4))
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual((codec.method, model), ('none', 'model-a'))
+        # No staging directories or pointer files are left behind
+        self.assertEqual(sorted(p.name for p in self.directory.iterdir()), [index_store.POINTER_FILE, name])
+
+    def test_older_build_never_replaces_newer_pointer(self):
+        newer = self.publish(2)
+        self.publish(1)
+        self.assertEqual(index_store.current_version(), newer)
+
+    def test_prune_keeps_newest_versions(self):
+        names = [self.publish(built_at) for built_at in (1, 2, 3)]
+        kept = sorted(p.name for p in self.directory.iterdir() if p.name.startswith('v'))
+        self.assertEqual(kept, names[1:])
+
+    def test_load_of_pruned_version(self):
+        self.assertIsNone(index_store.load('v0-gone'))
+
+
+class SharedMenuIndexTests(SharedIndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, search, '_index', None)
+        self.addCleanup(setattr, search, '_menu_version', search._menu_version)
+        search._index = None
+        search._menu_version = 0
+
+    def test_maps_another_workers_version_without_reading_items(self):
+        name = self.publish(1, ids=(7, 8))
+        # Only the active model is read from the database
+        with self.assertNumQueries(1):
+            index = search.get_menu_index()
+        self.assertEqual((index.source, list(index.ids)), (name, [7, 8]))
+
+    def test_switches_to_a_newer_published_version(self):
+        self.publish(1)
+        first = search.get_menu_index()
+        newer = self.publish(2, ids=(3, 4, 5))
+        index = search.get_menu_index()
+        self.assertIsNot(index, first)
+        self.assertEqual((index.source, len(index)), (newer, 3))
+
+    def test_version_of_another_model_is_rebuilt(self):
+        self.publish(1, model='model-b')
+        item, = MenuItem.objects.bulk_create([
+            MenuItem(name='Pizza', price=10, embedding=[1.0, 0.0], embedding_model='model-a')])
+        index = search.get_menu_index()
+        self.assertEqual((index.model, list(index.ids)), ('model-a', [item.pk]))
+
+    def test_rebuild_is_published(self):
+        MenuItem.objects.bulk_create([MenuItem(name='Pizza', price=10, embedding=[1.0, 0.0])])
+        index = search.get_menu_index()
+        self.assertEqual(index_store.current_version(), index.source)
+        ids, _, _, model = index_store.load(index.source)
+        self.assertEqual((list(ids), model), (list(index.ids), 'model-a'))
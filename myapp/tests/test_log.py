@@ -0,0 +1,46 @@
+import logging
+
+from django.test import SimpleTestCase
+
+from myapp.log import AsyncLogHandler, dropped_log_records
+
+
+class AsyncLogHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = AsyncLogHandler(maxsize=2, target=logging.NullHandler(), report_interval=0)
+        # Nothing drains the queue, so it fills up
+        self.handler.listener.stop()
+        self.handler.listener = None
+        self.addCleanup(self.handler.close)
+        self.logger = logging.Logger('test_log')
+        self.logger.addHandler(self.handler)
+
+    def drain(self):
+        records = []
+        while not self.handler.queue.empty():
+            records.append(self.handler.queue.get_nowait())
+        return records
+
+    def test_dropped_records_are_counted_and_reported(self):
+        for n in range(4):
+            self.logger.warning("record %s", n)
+        self.assertEqual(self.handler.dropped, 2)
+        self.assertGreaterEqual(dropped_log_records(), 2)
+        self.assertEqual([r.getMessage() for r in self.drain()], ["record 0", "record 1"])
+
+        self.logger.warning("record 4")
+        self.assertEqual([r.getMessage() for r in self.drain()],
+                         ["record 4", "Dropped 2 log records while the log queue was full"])
+
+        # Reported once, until more records are dropped
+        self.logger.warning("record 5")
+        self.assertEqual([r.getMessage() for r in self.drain()], ["record 5"])
+
+    def test_metrics_endpoint(self):
+        self.logger.warning("record")
+        self.logger.warning("record")
+        self.logger.warning("record")
+        response = self.client.get('/metrics/logging/')
+        self.assertEqual(response.json()['dropped_log_records'], dropped_log_records())
+        self.assertGreaterEqual(response.json()['dropped_log_records'], 1)
@@ -0,0 +1,35 @@
+import json
+from unittest import mock
+
+from django.test import AsyncClient, TestCase, override_settings
+
+from myapp.admission import get_gate
+from myapp.models import MenuItem
+
+
+@override_settings(MENU_IMPORT_CHUNK_SIZE=2)
+class ImportMenuTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('myapp.menu_import.embedding_queue.wake')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_progress_streams_under_asgi_while_holding_a_slot(self):
+        upload = ''.join(json.dumps({'name': f'Item {n}', 'price': n}) + '\n' for n in range(6))
+        response = await AsyncClient().post('/menu/import/', upload, content_type='application/x-ndjson')
+        self.assertTrue(response.is_async)
+
+        gate = get_gate()
+        lines = []
+        async for chunk in response.streaming_content:
+            lines.append(json.loads(chunk))
+            if len(lines) == 1:
+                # The first chunk was sent before the rest was written
+                self.assertEqual(lines[0], {'type': 'progress', 'rows': 2, 'created': 2, 'updated': 0, 'errors': 0})
+                self.assertEqual(await MenuItem.objects.acount(), 2)
+                self.assertEqual(gate.active_by_class['admin'], 1)
+
+        self.assertEqual(lines[-1]['type'], 'done')
+        self.assertEqual(lines[-1]['created'], 6)
+        self.assertEqual(gate.active_by_class['admin'], 0)
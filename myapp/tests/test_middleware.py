@@ -0,0 +1,99 @@
+import json
+import pstats
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, SimpleTestCase, override_settings
+
+from myapp.admission import PriorityGate
+from myapp.middleware import AdmissionControlMiddleware, sanitize_payload
+
+
+class AsgiMiddlewareTests(SimpleTestCase):
+
+    def test_admission_control_runs_async_under_asgi(self):
+        created = []
+        original = AdmissionControlMiddleware.__init__
+
+        def init(middleware, get_response):
+            original(middleware, get_response)
+            created.append(middleware)
+
+        with mock.patch.object(AdmissionControlMiddleware, '__init__', init):
+            ASGIHandler()
+        self.assertEqual(len(created), 1)
+        self.assertTrue(created[0].async_mode)
+
+    async def test_requests_wait_for_a_slot_without_a_thread(self):
+        with mock.patch.object(PriorityGate, 'acquire') as acquire, \
+                mock.patch.object(PriorityGate, 'acquire_async', autospec=True) as acquire_async:
+            response = await AsyncClient().get('/metrics/admission/')
+        self.assertEqual(response.status_code, 200)
+        acquire_async.assert_called_once()
+        acquire.assert_not_called()
+
+    async def test_async_profile_covers_the_view(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=directory):
+            response = await AsyncClient().get('/metrics/admission/', headers={'X-Profile': 'secret'})
+            self.assertIn('X-Profile-Id', response)
+            stats = pstats.Stats(str(Path(directory) / response['X-Profile-Id']))
+        self.assertTrue(any(name == 'admission_metrics' for _, _, name in stats.stats))
+
+    async def test_async_capture(self):
+        with tempfile.TemporaryDirectory() as directory:
+            capture = Path(directory) / 'capture.jsonl'
+            with override_settings(WEBHOOK_CAPTURE_FILE=str(capture),
+                                   WEBHOOK_CAPTURE_PATH_PREFIXES=['/metrics/']):
+                await AsyncClient().get('/metrics/admission/')
+            record = json.loads(capture.read_text())
+        self.assertEqual(record['path'], '/metrics/admission/')
+        self.assertEqual(record['status'], 200)
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+
+    def test_reading_profiles_is_not_profiled(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=directory):
+            for _ in range(3):
+                response = self.client.get('/profiles/', headers={'X-Profile': 'secret'})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Profile-Id', response)
+            self.assertEqual(list(Path(directory).glob('*.prof')), [])
+
+
+class SanitizePayloadTests(SimpleTestCase):
+
+    def tool_call(self, arguments):
+        return {'message': {'toolCalls': [{'id': 'call-1', 'function': {'name': 'order', 'arguments': arguments}}]}}
+
+    def arguments_of(self, payload):
+        return payload['message']['toolCalls'][0]['function']['arguments']
+
+    def test_object_arguments(self):
+        secrets = set()
+        payload = sanitize_payload(self.tool_call({
+            'customer_name': 'Alice Smith',
+            'special_instructions': 'ring flat 4',
+            'Order': {'name': 'Pizza'},
+        }), secrets)
+        self.assertEqual(self.arguments_of(payload), {
+            'customer_name': '[redacted]',
+            'special_instructions': '[redacted]',
+            'Order': {'name': 'Pizza'},
+        })
+        reply = sanitize_payload({'result': "Thanks Alice Smith, your order is in."}, secrets)
+        self.assertEqual(reply['result'], "Thanks [redacted], your order is in.")
+
+    def test_json_string_arguments(self):
+        payload = sanitize_payload(self.tool_call(json.dumps({
+            'customer_name': 'Bob Jones',
+            'Order': {'name': 'Pizza'},
+        })))
+        arguments = self.arguments_of(payload)
+        self.assertIsInstance(arguments, str)
+        self.assertNotIn('Bob Jones', arguments)
+        self.assertEqual(json.loads(arguments), {'customer_name': '[redacted]', 'Order': {'name': 'Pizza'}})
@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from myapp.models import Order
+from myapp.order_index import ActiveOrderIndex
+from myapp.tests.utils import make_orders
+
+
+class ActiveOrderIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = ActiveOrderIndex()
+        self.pizza = Order.objects.create(call_id='c1', item_name='Pizza', item_price=10, quantity=1)
+        self.assertEqual(self.index.find('pizza', call_id='c1'), self.pizza.id)
+
+    def test_finds_orders_placed_through_another_worker(self):
+        soda, = make_orders(1, call_id='c2', item_name='Soda')
+        self.assertEqual(self.index.find('soda', call_id='c2'), soda.id)
+
+    def test_refresh_drops_orders_closed_elsewhere(self):
+        second, = make_orders(1, call_id='c1')
+        Order.objects.filter(pk=self.pizza.pk).update(status='completed')
+        self.assertEqual(self.index.find('pizza', call_id='c1', refresh=True), second.id)
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.find('burger', call_id='c1'))
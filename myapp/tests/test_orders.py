@@ -0,0 +1,54 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from myapp.models import MenuItem, Order
+
+
+class BulkCreateOrdersTests(TestCase):
+
+    def setUp(self):
+        self.pizza = MenuItem.objects.create(name='Pizza', price=Decimal('12.50'), embedding_status='ready')
+        self.soda = MenuItem.objects.create(name='Soda', price=Decimal('2.00'), embedding_status='ready')
+        patcher = mock.patch('myapp.views.broadcast_order_update')
+        self.broadcast = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, orders):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/orders/bulk/', json.dumps({'orders': orders}),
+                                    content_type='application/json')
+
+    def test_creates_all_orders_and_broadcasts_once(self):
+        response = self.post([
+            {'item_id': self.pizza.id, 'quantity': 3, 'customer_name': 'Ann'},
+            {'item_name': 'Soda', 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['orders']), 2)
+        # bulk_create skips Order.save(), where the total is normally set
+        self.assertEqual(
+            list(Order.objects.order_by('pk').values_list('item_name', 'quantity', 'total_amount')),
+            [('Pizza', 3, Decimal('37.50')), ('Soda', 2, Decimal('4.00'))],
+        )
+        self.broadcast.assert_called_once_with()
+
+    def test_invalid_row_creates_nothing(self):
+        response = self.post([
+            {'item_id': self.pizza.id},
+            {'item_name': 'Soda', 'quantity': 0},
+            {'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertFalse(Order.objects.exists())
+        self.broadcast.assert_not_called()
+
+    def test_unknown_item_creates_nothing(self):
+        response = self.post([{'item_id': self.pizza.id}, {'item_id': self.soda.id + 100}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertFalse(Order.objects.exists())
+        self.broadcast.assert_not_called()
@@ -0,0 +1,61 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from myapp import search, utils
+from myapp.models import MenuItem, ReembedJob
+
+
+@override_settings(MENU_INDEX_DIR='', EMBEDDING_MODEL='old-model')
+class ActiveEmbeddingModelTests(TestCase):
+
+    def setUp(self):
+        MenuItem.objects.create(name='Pizza', price=10, embedding=[1.0, 0.0],
+                                embedding_model='old-model', embedding_status='ready')
+        self.addCleanup(setattr, search, '_index', None)
+
+    def test_index_follows_a_switch_made_by_another_process(self):
+        index = search.get_menu_index()
+        self.assertEqual(index.model, 'old-model')
+        self.assertEqual(index.matrix.shape, (1, 2))
+
+        # What reembed_menu does in its own process; this one is never told
+        MenuItem.objects.update(embedding=[0.0, 0.0, 1.0], embedding_model='new-model')
+        ReembedJob.objects.create(model='new-model', status='complete', finished_at=timezone.now())
+
+        self.assertEqual(search.get_active_embedding_model(), 'new-model')
+        index = search.get_menu_index()
+        self.assertEqual(index.model, 'new-model')
+        self.assertEqual(index.matrix.shape, (1, 3))
+
+    def test_rows_of_another_model_are_left_out(self):
+        MenuItem.objects.create(name='Soup', price=5, embedding=[0.0, 0.0, 1.0],
+                                embedding_model='other-model', embedding_status='ready')
+        index = search.MenuIndex.build(0)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.matrix.shape, (1, 2))
+
+
+@override_settings(MENU_INDEX_DIR='', EMBEDDING_MODEL='old-model')
+class SearchMenuItemsTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, search, '_index', None)
+
+    def test_edited_item_is_returned_once(self):
+        item = MenuItem.objects.create(name='Pepperoni Pizza', price=10, embedding=[1.0, 0.0],
+                                       embedding_model='old-model', embedding_status='ready')
+        # Redescribed: waiting for a new vector, the old one is still indexed
+        MenuItem.objects.filter(pk=item.pk).update(embedding_status='pending')
+
+        with mock.patch.object(utils, 'get_embeddings', return_value=np.array([[1.0, 0.0]])):
+            matches = utils.search_menu_items(['pepperoni pizza'])
+        self.assertEqual([(found.pk, score) for found, score in matches[0]], [(item.pk, 1.0)])
+
+    @override_settings(SEARCH_LEXICAL_MAX_ITEMS=2)
+    def test_lexical_pass_is_bounded(self):
+        oldest, middle, newest = MenuItem.objects.bulk_create([
+            MenuItem(name=f'Soup {n}', price=5, embedding_status='pending') for n in range(3)])
+        self.assertEqual(utils.lexical_matches(['soup'])[0], {newest.pk: 1.0, middle.pk: 1.0})
@@ -0,0 +1,52 @@
+import json
+
+from django.test import TransactionTestCase
+
+from myapp.idempotency import tool_call_responses
+from myapp.models import Order
+from myapp.order_index import active_orders
+from myapp.tests.utils import make_orders
+
+
+def remove_payload(name, tool_call_id, call_id='call-1'):
+    return json.dumps({'message': {'call': {'id': call_id}, 'toolCalls': [{
+        'id': tool_call_id,
+        'function': {'name': 'removeorder', 'arguments': {'Order': {'name': name}}},
+    }]}})
+
+
+class RemoveOrderWebhookTests(TransactionTestCase):
+
+    def setUp(self):
+        for _ in range(2):
+            Order.objects.create(call_id='call-1', item_name='Pizza', item_price=10, quantity=1)
+        active_orders.reset()
+        tool_call_responses.clear()
+        self.addCleanup(tool_call_responses.clear)
+
+    def remove(self, tool_call_id):
+        return self.client.post('/vapi/remove/', remove_payload('pizza', tool_call_id),
+                                content_type='application/json').json()
+
+    def test_retry_does_not_remove_another_order(self):
+        first = self.remove('tc-remove')
+        retry = self.remove('tc-remove')
+        self.assertEqual(retry, first)
+        self.assertEqual(Order.objects.count(), 1)
+
+        self.remove('tc-other')
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_clear_orders_forgets_results(self):
+        self.remove('tc-remove')
+        tool_call_responses.put('tc-order', {'results': [{'toolCallId': 'tc-order', 'result': "Order placed"}]})
+        self.assertEqual(self.client.delete('/orders/clear/').status_code, 200)
+        self.assertEqual(tool_call_responses.stats()['responses'], 0)
+
+    def test_remove_order_placed_through_another_worker(self):
+        active_orders.find('pizza', call_id='call-2')
+        make_orders(1, call_id='call-2', item_name='Soda')
+        result = self.client.post('/vapi/remove/', remove_payload('soda', 'tc-soda', call_id='call-2'),
+                                  content_type='application/json').json()
+        self.assertIn("I've removed order", result['results'][0]['result'])
+        self.assertFalse(Order.objects.filter(item_name='Soda').exists())
@@ -0,0 +1,12 @@
+import json
+
+from django.test import TestCase
+
+
+class SearchMenuBatchTests(TestCase):
+
+    def test_body_must_be_an_object(self):
+        for body in (['pizza'], 'pizza', 3):
+            response = self.client.post('/menu/search/batch/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'status': 'error', 'message': 'Request body must be a JSON object'})
@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from django.db import connection
+
+from myapp.models import Order
+
+
+def make_orders(count: int, **fields) -> List[Order]:
+    """Insert orders without sending signals, as another worker's writes look to this process"""
+    values = {'item_name': 'Pizza', 'item_price': 10, 'quantity': 1, 'total_amount': 10, **fields}
+    return Order.objects.bulk_create([Order(**values) for _ in range(count)], batch_size=1000)
+
+
+@contextmanager
+def orders_inserted_meanwhile(threads: int = 2) -> Iterator[Tuple[List[int], List[Exception]]]:
+    """Keep creating 'Live' orders from other threads while the block runs
+
+    Yields the ids inserted and the errors the threads hit; both are complete
+    once the block has exited.
+    """
+    stop = threading.Event()
+    inserted: List[int] = []
+    errors: List[Exception] = []
+
+    def insert():
+        try:
+            while not stop.is_set():
+                inserted.append(Order.objects.create(item_name='Live', item_price=1, quantity=1).pk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=insert) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    # Let the inserts get going before the code under test starts
+    time.sleep(0.05)
+    try:
+        yield inserted, errors
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
@@ -8,13 +8,25 @@ urlpatterns = [
     path('menu/', views.get_menu, name='get_menu'),
     path('menu/update/', views.update_menu, name='update_menu'),
     path('menu/search/', views.search_menu, name='search_menu'),
+    path('menu/search/batch/', views.search_menu_batch, name='search_menu_batch'),
+    path('menu/embeddings/', views.embedding_status, name='embedding_status'),
+    path('menu/embeddings/retry/', views.retry_embeddings, name='retry_embeddings'),
+    path('menu/aliases/', views.menu_aliases, name='menu_aliases'),
+    path('menu/aliases/<int:alias_id>/', views.delete_menu_alias, name='delete_menu_alias'),
     path('vapi/webhook/', views.vapi_menu_webhook, name='vapi_menu_webhook'),
     path('vapi/order/', views.vapi_order_webhook, name='vapi_order_webhook'),
     path('menu/<int:item_id>/', views.delete_menu_item, name='delete_menu_item'),
     path('menu/replace/', views.replace_menu, name='replace_menu'),
+    path('menu/import/', views.import_menu, name='import_menu'),
     path('orders/', views.get_orders, name='get_orders'),
     path('orders/<int:order_id>/', views.get_order, name='get_order'),
+    path('orders/bulk/', views.bulk_create_orders, name='bulk_create_orders'),
     path('orders/clear/', views.clear_orders, name='clear_orders'),
     path('orders/<int:order_id>/delete/', views.delete_order, name='delete_order'),
     path('vapi/remove/', views.vapi_remove_order_webhook, name='vapi_remove_order_webhook'),
+    path('profiles/', views.list_profiles, name='list_profiles'),
+    path('profiles/<str:name>/', views.download_profile, name='download_profile'),
+    path('metrics/admission/', views.admission_metrics, name='admission_metrics'),
+    path('metrics/sessions/', views.call_session_metrics, name='call_session_metrics'),
+    path('metrics/logging/', views.log_metrics, name='log_metrics'),
 ]
\ No newline at end of file
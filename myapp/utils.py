@@ -4,9 +4,12 @@ from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.http import JsonResponse
 from .models import MenuItem
+from .search import get_active_embedding_model, get_menu_index
+from .aliases import lookup_alias, lookup_aliases, normalize_phrase
 import numpy as np
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from numpy.typing import NDArray
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +20,8 @@ def get_client():
     env_key = os.getenv('OPENAI_API_KEY')
     settings_key = settings.OPENAI_API_KEY
     
-    logger.info(f"Key in env: {'Yes' if env_key else 'No'}")
-    logger.info(f"Key in settings: {'Yes' if settings_key else 'No'}")
+    logger.info("Key in env: %s", 'Yes' if env_key else 'No')
+    logger.info("Key in settings: %s", 'Yes' if settings_key else 'No')
     
     api_key = settings_key or env_key
     if not api_key:
@@ -32,48 +35,132 @@ try:
     client = get_client()
     logger.info("OpenAI client initialized successfully")
 except Exception as e:
-    logger.error(f"Failed to initialize OpenAI client: {str(e)}")
+    logger.error("Failed to initialize OpenAI client: %s", e)
     raise
 
-def get_embedding(text):
+def get_embedding(text, model: Optional[str] = None):
     """Get OpenAI embedding for text"""
     try:
         response = client.embeddings.create(
-            model="text-embedding-ada-002",
+            model=model or get_active_embedding_model(),
             input=text
         )
         return np.array(response.data[0].embedding)
     except Exception as e:
-        logger.error(f"Error getting embedding: {str(e)}")
+        logger.error("Error getting embedding: %s", e)
         raise ImproperlyConfigured(f"OpenAI API error: {str(e)}")
 
+def get_embeddings(texts: List[str], model: Optional[str] = None) -> NDArray:
+    """Get OpenAI embeddings for many texts in a single request"""
+    try:
+        response = client.embeddings.create(
+            model=model or get_active_embedding_model(),
+            input=texts
+        )
+        ordered = sorted(response.data, key=lambda d: d.index)
+        return np.array([d.embedding for d in ordered])
+    except Exception as e:
+        logger.error("Error getting embeddings: %s", e)
+        raise ImproperlyConfigured(f"OpenAI API error: {str(e)}")
+
+def lexical_matches(queries: List[str], min_score: float = 0.7) -> List[Dict[int, float]]:
+    """Match queries by word overlap against items that have no embedding yet
+
+    Returns item id -> score per query. Only the SEARCH_LEXICAL_MAX_ITEMS most
+    recently added waiting items are considered, so a large import does not
+    make every lookup scan the whole menu.
+    """
+    waiting = list(
+        MenuItem.objects.exclude(embedding_status='ready')
+        .order_by('-pk')
+        .values_list('id', 'name', 'description')[:settings.SEARCH_LEXICAL_MAX_ITEMS]
+    )
+    if not waiting:
+        return [{} for _ in queries]
+
+    item_words = [(item_id, set(normalize_phrase(f"{name} {description}").split()))
+                  for item_id, name, description in waiting]
+    results = []
+    for query in queries:
+        words = set(normalize_phrase(query).split())
+        matches = {}
+        if words:
+            for item_id, vocabulary in item_words:
+                score = len(words & vocabulary) / len(words)
+                if score >= min_score:
+                    matches[item_id] = score
+        results.append(matches)
+    return results
+
+def search_menu_items(
+    queries: List[str],
+    top_k: Optional[int] = None,
+    min_score: float = 0.7
+) -> List[List[Tuple[MenuItem, float]]]:
+    """Embed all queries in one call and score them against the menu index"""
+    if not queries:
+        return []
+
+    # Items still waiting for their vectors are only searchable by words
+    scores = lexical_matches(queries, min_score=min_score)
+
+    index = get_menu_index()
+    if len(index):
+        query_embeddings = get_embeddings(queries, model=index.model)
+        for found, row in zip(scores, index.search(query_embeddings, top_k=top_k, min_score=min_score)):
+            # An edited item waits for a new vector but is still indexed with its old one
+            for item_id, score in row:
+                found[item_id] = max(score, found.get(item_id, 0.0))
+
+    # Fetch only the matched items, in one query
+    items = MenuItem.objects.in_bulk({item_id for found in scores for item_id in found})
+    results = []
+    for found in scores:
+        matches = sorted(((items[item_id], score) for item_id, score in found.items() if item_id in items),
+                         key=lambda match: match[1], reverse=True)
+        results.append(matches if top_k is None else matches[:top_k])
+    return results
+
 def find_similar_items(query: str, threshold: float = 0.7) -> List[MenuItem]:
     """Find menu items similar to query using embeddings"""
     try:
-        # Get query embedding
-        query_embedding = get_embedding(query)
-        
-        # Get all menu items
-        items = MenuItem.objects.all()
-        
-        # Calculate similarities and filter by threshold
-        similar_items = []
-        for item in items:
-            item_embedding = item.get_embedding()
-            if item_embedding is not None:
-                # Use numpy dot product for cosine similarity
-                similarity = np.dot(query_embedding, item_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(item_embedding)
-                )
-                if similarity >= threshold:
-                    similar_items.append((item, similarity))
-        
-        # Sort by similarity score
-        similar_items.sort(key=lambda x: x[1], reverse=True)
+        similar_items = search_menu_items([query], min_score=threshold)[0]
         
         # Return just the items, without scores
         return [item for item, _ in similar_items]
         
     except Exception as e:
-        logger.error(f"Similarity search error: {str(e)}")
-        return [] 
\ No newline at end of file
+        logger.error("Similarity search error: %s", e)
+        return []
+
+def resolve_menu_item(query: str) -> Optional[MenuItem]:
+    """Resolve a spoken phrase to a menu item, trying learned aliases before embeddings"""
+    item = lookup_alias(query)
+    if item is not None:
+        return item
+
+    similar_items = find_similar_items(query)
+    return similar_items[0] if similar_items else None
+
+def resolve_menu_items(queries: List[str], threshold: float = 0.7) -> List[Optional[MenuItem]]:
+    """Resolve many item names at once: exact names, then aliases, then one batched search"""
+    found = {}
+    unique = list(dict.fromkeys(queries))
+    for item in MenuItem.objects.filter(name__in=unique).order_by('-pk'):
+        found[item.name] = item
+
+    remaining = [query for query in unique if query not in found]
+    if remaining:
+        alias_ids = lookup_aliases(remaining)
+        items = MenuItem.objects.in_bulk(set(alias_ids.values()))
+        for query, item_id in alias_ids.items():
+            if item_id in items:
+                found[query] = items[item_id]
+
+    remaining = [query for query in remaining if query not in found]
+    if remaining:
+        for query, matches in zip(remaining, search_menu_items(remaining, top_k=1, min_score=threshold)):
+            if matches:
+                found[query] = matches[0][0]
+
+    return [found.get(query) for query in queries]
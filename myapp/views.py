@@ -1,21 +1,35 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
-from .models import MenuItem, Order
-from .utils import get_embedding, find_similar_items
-from typing import Dict, List, Any, Optional
+from .models import MenuItem, Order, ArchivedOrder, MenuAlias
+from .archive import order_history
+from .serializers import dumps, json_response, serialize_order, serialize_order_rows, serialize_orders
+from .utils import find_similar_items, search_menu_items, resolve_menu_item, resolve_menu_items
+from .aliases import alias_stats, learn_alias, normalize_phrase
+from . import bulk_delete, embedding_queue, menu_import
+from .middleware import profile_dir
+from .admission import get_gate
+from .order_index import active_orders
+from .call_sessions import call_sessions
+from .idempotency import tool_call_responses
+from .search import get_menu_version, invalidate_menu_index
+from typing import AsyncIterator, Dict, Iterator, List, Any, Optional
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
 from django.db.models import Model
 import logging
 import requests
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from openai import OpenAI
 from django.conf import settings
-from .consumers import OrderConsumer
+from .broadcast import broadcast_orders, invalidate_orders_snapshot
+from .log import LazyJson, dropped_log_records
 
 logger = logging.getLogger(__name__)
+# Full webhook payloads, sampled by settings.LOG_PAYLOAD_SAMPLE_RATE
+payload_logger = logging.getLogger('myapp.payloads')
 
 def home(request):
     return HttpResponse("Welcome to the homepage!")
@@ -27,11 +41,8 @@ def add_menu_item(request):
         description="Fresh tomatoes, mozzarella, basil",
         price=12.99
     )
-    # Get and store embedding
-    embedding = get_embedding(f"{item.name} {item.description}")
-    item.set_embedding(embedding)
-    item.save()
-    return JsonResponse({"status": "success"})
+    # Embedding is generated in the background
+    return JsonResponse({"status": "success", "id": item.id, "embedding_status": item.embedding_status})
 
 def search_menu(request):
     """Search menu items using embeddings"""
@@ -60,7 +71,7 @@ def search_menu(request):
             "message": f"Found {len(results)} matching items" if results else "No matching items found"
         })
     except Exception as e:
-        logger.error(f"Search error: {str(e)}")
+        logger.error("Search error: %s", e)
         return JsonResponse({
             "status": "error",
             "found": False,
@@ -68,15 +79,70 @@ def search_menu(request):
             "items": []
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def search_menu_batch(request) -> JsonResponse:
+    """Search menu items for many queries at once, with scores"""
+    try:
+        data: Dict[str, Any] = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        queries = data.get('queries')
+        if (not isinstance(queries, list) or not queries
+                or not all(isinstance(q, str) and q.strip() for q in queries)):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'queries must be a non-empty list of strings'
+            }, status=400)
+        if len(queries) > settings.SEARCH_MAX_QUERIES:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'At most {settings.SEARCH_MAX_QUERIES} queries are allowed per request'
+            }, status=400)
+
+        top_k = int(data.get('top_k', settings.SEARCH_DEFAULT_TOP_K))
+        min_score = float(data.get('min_score', settings.SEARCH_DEFAULT_MIN_SCORE))
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+
+    try:
+        matches = search_menu_items([q.strip() for q in queries], top_k=top_k, min_score=min_score)
+        results = [{
+            'query': query,
+            'found': bool(row),
+            'items': [{
+                'id': item.id,
+                'name': item.name,
+                'price': str(item.price),
+                'description': item.description,
+                'score': round(score, 4)
+            } for item, score in row]
+        } for query, row in zip(queries, matches)]
+
+        return JsonResponse({
+            'status': 'success',
+            'results': results
+        })
+    except Exception as e:
+        logger.error("Batch search error: %s", e)
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Search service temporarily unavailable'
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_menu(request) -> JsonResponse:
-    """Update or create menu items with embeddings"""
+    """Update or create menu items, queueing embeddings in the background"""
     try:
         data: List[Dict[str, Any]] = json.loads(request.body)
         updated_items = []
         
         for item_data in data:
+            # New or re-described items are queued for embedding on save
             item, created = MenuItem.objects.update_or_create(
                 name=item_data['name'],
                 defaults={
@@ -85,17 +151,13 @@ def update_menu(request) -> JsonResponse:
                 }
             )
             
-            # Generate and store embedding
-            text = f"{item.name} {item.description}"
-            embedding = get_embedding(text)
-            item.set_embedding(embedding)
-            item.save()
-            
             updated_items.append({
+                'id': item.id,
                 'name': item.name,
                 'price': str(item.price),
                 'description': item.description,
-                'status': 'created' if created else 'updated'
+                'status': 'created' if created else 'updated',
+                'embedding_status': item.embedding_status
             })
         
         return JsonResponse({
@@ -109,6 +171,36 @@ def update_menu(request) -> JsonResponse:
             'message': str(e)
         }, status=400)
 
+@require_http_methods(["GET"])
+def embedding_status(request) -> JsonResponse:
+    """Progress of background menu embedding"""
+    counts = embedding_queue.progress()
+    total = sum(counts.values())
+    response = {
+        'status': 'success',
+        'counts': counts,
+        'total': total,
+        'complete': counts['ready'] == total,
+        'progress': round(counts['ready'] / total, 4) if total else 1.0
+    }
+    if counts['failed']:
+        response['failed'] = list(
+            MenuItem.objects.filter(embedding_status='failed').values('id', 'name', 'embedding_error')[:50]
+        )
+    return JsonResponse(response)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def retry_embeddings(request) -> JsonResponse:
+    """Queue failed embeddings again"""
+    failed_ids = MenuItem.objects.filter(embedding_status='failed').values_list('id', flat=True)
+    count = embedding_queue.enqueue(failed_ids)
+    return JsonResponse({
+        'status': 'success',
+        'message': f'Requeued {count} items',
+        'requeued': count
+    })
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_menu(request) -> JsonResponse:
@@ -142,23 +234,31 @@ def vapi_menu_webhook(request):
         tool_call_id = menu_tool_call['id'] if menu_tool_call else "0dca5b3f-59c3-4236-9784-84e560fb26ef"
         
         try:
-            # Get all menu items
-            menu_items = MenuItem.objects.all()
-            
-            if menu_items:
-                # Format menu items into sections
-                menu_text = "Here's our current menu:\n\n"
-                
-                # Group by categories if you have them, or just list all items
-                menu_text += "\n".join(
-                    f"• {item.name}"
-                    for item in menu_items
-                )
-                
-                menu_text += "\n\nWhat would you like to know more about?"
-                response_text = menu_text
+            # Reuse the menu already read out on this call if it hasn't changed
+            session = call_sessions.get(get_call_id(received))
+            menu_version = get_menu_version()
+            if session is not None and session.menu_text and session.menu_text[0] == menu_version:
+                response_text = session.menu_text[1]
             else:
-                response_text = "I apologize, but our menu is currently being updated. Please check back soon!"
+                # Get all menu item names
+                menu_names = list(MenuItem.objects.values_list('name', flat=True))
+                
+                if menu_names:
+                    # Format menu items into sections
+                    menu_text = "Here's our current menu:\n\n"
+                    
+                    # Group by categories if you have them, or just list all items
+                    menu_text += "\n".join(
+                        f"• {name}"
+                        for name in menu_names
+                    )
+                    
+                    menu_text += "\n\nWhat would you like to know more about?"
+                    response_text = menu_text
+                    if session is not None:
+                        session.menu_text = (menu_version, response_text)
+                else:
+                    response_text = "I apologize, but our menu is currently being updated. Please check back soon!"
 
             response = {
                 "results": [{
@@ -171,7 +271,7 @@ def vapi_menu_webhook(request):
             return JsonResponse(response)
             
         except Exception as e:
-            logger.error(f"Menu retrieval failed: {str(e)}")
+            logger.error("Menu retrieval failed: %s", e)
             response_text = "I'm having trouble accessing our menu right now. Please try again in a moment."
             response = {
                 "results": [{
@@ -180,11 +280,11 @@ def vapi_menu_webhook(request):
                     "name": "menu"
                 }]
             }
-            logger.info(f"Error Response: {json.dumps(response)}")
+            logger.info("Error Response: %s", LazyJson(response))
             return JsonResponse(response)
             
     except Exception as e:
-        logger.error(f"Webhook error: {str(e)}")
+        logger.error("Webhook error: %s", e)
         response = {
             "results": [{
                 "toolCallId": "0dca5b3f-59c3-4236-9784-84e560fb26ef",
@@ -192,9 +292,78 @@ def vapi_menu_webhook(request):
                 "name": "menu"
             }]
         }
-        logger.info(f"Error Response: {json.dumps(response)}")
+        logger.info("Error Response: %s", LazyJson(response))
         return JsonResponse(response)
 
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def menu_aliases(request) -> JsonResponse:
+    """List learned phrase aliases, or add one by hand"""
+    if request.method == 'GET':
+        aliases = MenuAlias.objects.select_related('menu_item').order_by('phrase')
+        return JsonResponse({
+            'status': 'success',
+            'stats': alias_stats(),
+            'aliases': [{
+                'id': alias.id,
+                'phrase': alias.phrase,
+                'item_id': alias.menu_item_id,
+                'item_name': alias.menu_item.name,
+                'source': alias.source
+            } for alias in aliases]
+        })
+
+    try:
+        data: Dict[str, Any] = json.loads(request.body)
+        phrase = normalize_phrase(data.get('phrase', ''))
+        if not phrase:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'phrase is required'
+            }, status=400)
+
+        item = MenuItem.objects.get(id=data['item_id'])
+        alias, created = MenuAlias.objects.update_or_create(
+            phrase=phrase,
+            defaults={'menu_item': item, 'source': 'admin'}
+        )
+        return JsonResponse({
+            'status': 'success',
+            'alias': {
+                'id': alias.id,
+                'phrase': alias.phrase,
+                'item_id': item.id,
+                'item_name': item.name,
+                'source': alias.source
+            },
+            'created': created
+        })
+    except MenuItem.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': f"Menu item with id {data['item_id']} not found"
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def delete_menu_alias(request, alias_id: int) -> JsonResponse:
+    """Delete a learned alias by ID"""
+    deleted, _ = MenuAlias.objects.filter(id=alias_id).delete()
+    if not deleted:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Alias with id {alias_id} not found'
+        }, status=404)
+    return JsonResponse({
+        'status': 'success',
+        'deleted_id': alias_id
+    })
+
 @csrf_exempt
 @require_http_methods(["DELETE"])
 def delete_menu_item(request, item_id: int) -> JsonResponse:
@@ -215,7 +384,7 @@ def delete_menu_item(request, item_id: int) -> JsonResponse:
             'message': f'Menu item with id {item_id} not found'
         }, status=404)
     except Exception as e:
-        logger.error(f"Delete error: {str(e)}")
+        logger.error("Delete error: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
@@ -228,30 +397,30 @@ def replace_menu(request) -> JsonResponse:
     try:
         data: List[Dict[str, Any]] = json.loads(request.body)
         
-        # Delete all existing items
-        MenuItem.objects.all().delete()
+        # Delete all existing items and their aliases in short chunked transactions
+        bulk_delete.clear_menu(
+            progress=lambda total: logger.info("Deleted %s menu items so far", total)
+        )
         
-        # Create new items
-        new_items = []
-        for item_data in data:
-            item = MenuItem.objects.create(
+        # Create new items; embeddings are generated in the background
+        items = MenuItem.objects.bulk_create([
+            MenuItem(
                 name=item_data['name'],
                 description=item_data.get('description', ''),
                 price=float(item_data['price'])
-            )
-            
-            # Generate and store embedding
-            text = f"{item.name} {item.description}"
-            embedding = get_embedding(text)
-            item.set_embedding(embedding)
-            item.save()
-            
-            new_items.append({
-                'id': item.id,
-                'name': item.name,
-                'price': str(item.price),
-                'description': item.description
-            })
+            ) for item_data in data
+        ])
+        # bulk_create sends no post_save either
+        invalidate_menu_index()
+        embedding_queue.wake()
+        
+        new_items = [{
+            'id': item.id,
+            'name': item.name,
+            'price': str(item.price),
+            'description': item.description,
+            'embedding_status': item.embedding_status
+        } for item in items]
         
         return JsonResponse({
             'status': 'success',
@@ -260,12 +429,51 @@ def replace_menu(request) -> JsonResponse:
         })
     
     except Exception as e:
-        logger.error(f"Replace menu error: {str(e)}")
+        logger.error("Replace menu error: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
         }, status=400)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def import_menu(request):
+    """Stream an NDJSON or CSV menu upload into the database in fixed-size chunks
+
+    `?mode=replace` also deletes items missing from the upload. The response
+    is NDJSON: progress after every chunk, one line per rejected row and a
+    final summary. Under ASGI each chunk is written from the request's sync
+    thread and its progress line is sent as soon as it is done.
+    """
+    mode = request.GET.get('mode', 'upsert')
+    try:
+        if mode not in ('upsert', 'replace'):
+            raise ValueError(f"Unknown mode '{mode}', expected upsert or replace")
+        fmt = menu_import.detect_format(request.content_type, request.GET.get('format'))
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+
+    # The upload is read line by line while the response is streamed
+    events = menu_import.import_menu(request, fmt, replace=mode == 'replace')
+    lines = (dumps(event) + '\n' for event in events)
+    return StreamingHttpResponse(
+        # ASGI only streams async iterators, it buffers sync ones to the end
+        iterate_in_thread(lines) if isinstance(request, ASGIRequest) else lines,
+        content_type='application/x-ndjson'
+    )
+
+async def iterate_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Async iterator over a blocking one, each step run in the request's sync thread"""
+    done = object()
+    while True:
+        item = await sync_to_async(next)(iterator, done)
+        if item is done:
+            return
+        yield item
+
 def infer_order_from_conversation(messages) -> tuple[str, int]:
     """Use OpenAI to infer order details from conversations"""
     try:
@@ -295,7 +503,7 @@ def infer_order_from_conversation(messages) -> tuple[str, int]:
         return item_name.strip(), int(quantity)
         
     except Exception as e:
-        logger.error(f"Error inferring order: {str(e)}")
+        logger.error("Error inferring order: %s", e)
         return None, 1
 
 def parse_tool_call_arguments(tool_call, tool_name):
@@ -314,15 +522,20 @@ def parse_tool_call_arguments(tool_call, tool_name):
         query = order_data.get('name', '').strip()
         quantity = order_data.get('quantity', 1)
         
-        logger.info(f"Parsed {tool_name} details - Item: '{query}', Quantity: {quantity}")
+        logger.info("Parsed %s details - Item: '%s', Quantity: %s", tool_name, query, quantity)
         
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse arguments JSON: {e}")
+        logger.error("Failed to parse arguments JSON: %s", e)
         query = ''
         quantity = 1
         
     return query, quantity
 
+def get_call_id(received_data) -> str:
+    """Extract the VAPI call id from a webhook payload"""
+    call = received_data.get('message', {}).get('call') or received_data.get('call') or {}
+    return str(call.get('id') or '')
+
 def get_tool_call(received_data, tool_name):
     """Extract specific tool call from received data"""
     # Check in toolCalls array first
@@ -342,14 +555,20 @@ def get_tool_call(received_data, tool_name):
 
 def broadcast_order_update():
     """Broadcast order updates via WebSocket"""
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "orders",
-        {
-            "type": "orders_update",
-            "orders": async_to_sync(OrderConsumer().get_orders)()
-        }
-    )
+    broadcast_orders()
+
+def resolve_for_call(session, query):
+    """Resolve a menu item, reusing what was already resolved earlier in the call"""
+    phrase = normalize_phrase(query)
+    if session is not None and phrase in session.resolved_items:
+        menu_item = MenuItem.objects.filter(pk=session.resolved_items[phrase]).first()
+        if menu_item is not None:
+            return menu_item
+    
+    menu_item = resolve_menu_item(query)
+    if menu_item is not None and session is not None:
+        session.resolved_items[phrase] = menu_item.id
+    return menu_item
 
 def create_error_response(tool_call_id, message):
     """Create error response JSON"""
@@ -361,6 +580,33 @@ def create_error_response(tool_call_id, message):
         }]
     })
 
+def order_created_response(tool_call_id, order) -> Dict[str, Any]:
+    """Result sent to VAPI for a placed order"""
+    response_text = (f"I've created order #{order.id} for {order.quantity}x {order.item_name}. "
+                    f"Total amount: ${order.total_amount}")
+    return {
+        "results": [{
+            "toolCallId": tool_call_id,
+            "result": response_text,
+            "name": "order",
+            "order_id": str(order.id),
+            "quantity": order.quantity
+        }]
+    }
+
+def replay_tool_call(tool_call_id) -> Optional[Dict[str, Any]]:
+    """Stored result of an already handled tool call, from memory or from its order"""
+    response = tool_call_responses.get(tool_call_id)
+    if response is None and tool_call_id:
+        # Handled by another worker, or before a restart
+        order = Order.objects.filter(tool_call_id=tool_call_id).first()
+        if order is not None:
+            response = order_created_response(tool_call_id, order)
+            tool_call_responses.put(tool_call_id, response)
+    if response is not None:
+        logger.info("Replaying result of tool call %s", tool_call_id)
+    return response
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def vapi_order_webhook(request):
@@ -376,6 +622,11 @@ def vapi_order_webhook(request):
             )
             
         tool_call_id = order_tool_call['id']
+        # A retry of a tool call we already handled gets the original result
+        response = replay_tool_call(tool_call_id)
+        if response is not None:
+            return JsonResponse(response)
+
         query, quantity = parse_tool_call_arguments(order_tool_call, 'order')
         
         if not query:
@@ -384,43 +635,61 @@ def vapi_order_webhook(request):
                 "What would you like to order from our menu?"
             )
             
-        similar_items = find_similar_items(query)
-        if not similar_items:
+        call_id = get_call_id(received)
+        session = call_sessions.get(call_id)
+        menu_item = resolve_for_call(session, query)
+        if menu_item is None:
             return create_error_response(
                 tool_call_id,
                 f"I couldn't find '{query}' on our menu. Would you like to see our menu?"
             )
-            
-        menu_item = similar_items[0]
+        
+        arguments = order_tool_call.get('function', {}).get('arguments', {})
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments)
+        customer_name = arguments.get('customer_name', '').strip()
+        if session is not None:
+            # Callers usually give their name once per call
+            if customer_name:
+                session.customer_name = customer_name
+            else:
+                customer_name = session.customer_name
         
         # Create order with direct item information
-        order = Order.objects.create(
-            quantity=quantity,
-            item_name=menu_item.name,
-            item_price=menu_item.price,
-            customer_name=order_tool_call.get('function', {}).get('arguments', {}).get('customer_name', '').strip(),
-            special_instructions=order_tool_call.get('function', {}).get('arguments', {}).get('special_instructions', '').strip()
-        )
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    call_id=call_id,
+                    tool_call_id=tool_call_id or None,
+                    quantity=quantity,
+                    item_name=menu_item.name,
+                    item_price=menu_item.price,
+                    customer_name=customer_name,
+                    special_instructions=arguments.get('special_instructions', '').strip()
+                )
+        except IntegrityError:
+            # A concurrent retry of the same tool call placed the order first
+            response = replay_tool_call(tool_call_id)
+            if response is None:
+                raise
+            return JsonResponse(response)
         
-        logger.info(f"Created order #{order.id} for {quantity}x {menu_item.name}")
+        logger.info("Created order #%s for %sx %s", order.id, quantity, menu_item.name)
         
-        broadcast_order_update()
+        # Remember how the caller asked for this item
+        try:
+            learn_alias(query, menu_item)
+        except Exception as e:
+            logger.error("Failed to learn alias for '%s': %s", query, e)
         
-        response_text = (f"I've created order #{order.id} for {quantity}x {menu_item.name}. "
-                        f"Total amount: ${order.total_amount}")
+        broadcast_order_update()
         
-        return JsonResponse({
-            "results": [{
-                "toolCallId": tool_call_id,
-                "result": response_text,
-                "name": "order",
-                "order_id": str(order.id),
-                "quantity": quantity
-            }]
-        })
+        response = order_created_response(tool_call_id, order)
+        tool_call_responses.put(tool_call_id, response)
+        return JsonResponse(response)
             
     except Exception as e:
-        logger.error(f"Order webhook error: {str(e)}", exc_info=True)
+        logger.error("Order webhook error: %s", e, exc_info=True)
         return create_error_response(
             tool_call_id if 'tool_call_id' in locals() else "0dca5b3f-59c3-4236-9784-84e560fb26ef",
             "Sorry, I'm having trouble processing your order right now."
@@ -434,13 +703,11 @@ def get_orders(request) -> JsonResponse:
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('per_page', 10))
         status = request.GET.get('status', None)
-        
-        # Start with all orders
-        orders = Order.objects.all()
+        include_archived = request.GET.get('include_archived', '').lower() in ('1', 'true', 'yes')
         
         # Apply filters
-        if status:
-            orders = orders.filter(status=status)
+        filters = {'status': status} if status else {}
+        orders = order_history(include_archived=include_archived, **filters)
             
         # Get total count before pagination
         total_count = orders.count()
@@ -450,23 +717,9 @@ def get_orders(request) -> JsonResponse:
         end = start + per_page
         orders = orders.order_by('-created_at')[start:end]
         
-        orders_list = []
-        for order in orders:
-            orders_list.append({
-                'id': order.id,
-                'status': order.status,
-                'customer_name': order.customer_name,
-                'created_at': order.created_at.isoformat(),
-                'total_amount': str(order.total_amount),
-                'special_instructions': order.special_instructions,
-                'item_name': order.item_name,
-                'quantity': order.quantity,
-                'item_price': str(order.item_price)
-            })
-        
-        return JsonResponse({
+        return json_response({
             'status': 'success',
-            'orders': orders_list,
+            'orders': serialize_order_rows(orders),
             'pagination': {
                 'current_page': page,
                 'per_page': per_page,
@@ -476,7 +729,7 @@ def get_orders(request) -> JsonResponse:
         })
     
     except Exception as e:
-        logger.error(f"Get orders error: {str(e)}")
+        logger.error("Get orders error: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
@@ -486,29 +739,122 @@ def get_orders(request) -> JsonResponse:
 def get_order(request, order_id: int) -> JsonResponse:
     """Get a specific order by ID"""
     try:
-        order = Order.objects.get(id=order_id)
+        # Fall back to the archive for orders moved out of the hot table
+        order = (serialize_order(Order.objects.filter(id=order_id))
+                 or serialize_order(ArchivedOrder.objects.filter(id=order_id)))
+        if order is None:
+            raise ArchivedOrder.DoesNotExist
         
-        return JsonResponse({
+        return json_response({
             'status': 'success',
-            'order': {
-                'id': order.id,
-                'status': order.status,
-                'customer_name': order.customer_name,
-                'created_at': order.created_at.isoformat(),
-                'total_amount': str(order.total_amount),
-                'special_instructions': order.special_instructions,
-                'item_name': order.item_name,
-                'quantity': order.quantity,
-                'item_price': str(order.item_price)
-            }
+            'order': order
         })
-    except Order.DoesNotExist:
+    except ArchivedOrder.DoesNotExist:
         return JsonResponse({
             'status': 'error',
             'message': f'Order with id {order_id} not found'
         }, status=404)
     except Exception as e:
-        logger.error(f"Get order error: {str(e)}")
+        logger.error("Get order error: %s", e)
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def bulk_create_orders(request) -> JsonResponse:
+    """Create many orders in one transaction and broadcast once
+
+    Body: {"orders": [{"item_id": 3 | "item_name": "...", "quantity": 2,
+    "customer_name": "...", "special_instructions": "..."}, ...]}. Nothing is
+    created unless every row is valid and resolves to a menu item.
+    """
+    try:
+        rows = json.loads(request.body).get('orders')
+        if not isinstance(rows, list) or not rows:
+            raise ValueError('orders must be a non-empty list')
+        if len(rows) > settings.ORDER_BULK_MAX:
+            raise ValueError(f'At most {settings.ORDER_BULK_MAX} orders are allowed per request')
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+
+    errors = []
+    item_ids = {}
+    item_names = {}
+    for index, row in enumerate(rows):
+        try:
+            quantity = int(row.get('quantity', 1))
+            if quantity < 1:
+                raise ValueError('quantity must be at least 1')
+            if row.get('item_id') is not None:
+                item_ids[index] = int(row['item_id'])
+            elif str(row.get('item_name') or '').strip():
+                item_names[index] = str(row['item_name']).strip()
+            else:
+                raise ValueError('item_id or item_name is required')
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append({'index': index, 'message': str(e)})
+    if errors:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid orders',
+            'errors': errors
+        }, status=400)
+
+    try:
+        # Ids in one query, names in one batch (exact, alias, then a single search)
+        by_id = MenuItem.objects.in_bulk(set(item_ids.values()))
+        items = {index: by_id.get(item_id) for index, item_id in item_ids.items()}
+        items.update(zip(item_names, resolve_menu_items(list(item_names.values()))))
+        errors = [{
+            'index': index,
+            'message': f"Menu item '{item_names.get(index, item_ids.get(index))}' not found"
+        } for index in sorted(items) if items[index] is None]
+        if errors:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Some menu items could not be found',
+                'errors': errors
+            }, status=400)
+
+        orders = []
+        for index, row in enumerate(rows):
+            menu_item = items[index]
+            quantity = int(row.get('quantity', 1))
+            # bulk_create skips Order.save(), so the total is computed here
+            orders.append(Order(
+                item_name=menu_item.name,
+                item_price=menu_item.price,
+                quantity=quantity,
+                total_amount=menu_item.price * quantity,
+                customer_name=str(row.get('customer_name') or '').strip(),
+                special_instructions=str(row.get('special_instructions') or '').strip()
+            ))
+
+        def index_orders():
+            for order in orders:
+                active_orders.update(order)
+
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(orders)
+            # bulk_create sends no post_save, so do what the Order signals would, once
+            transaction.on_commit(invalidate_orders_snapshot)
+            transaction.on_commit(index_orders)
+            transaction.on_commit(broadcast_order_update)
+
+        logger.info("Created %s orders in bulk", len(orders))
+        return json_response({
+            'status': 'success',
+            'message': f'Created {len(orders)} orders',
+            'orders': serialize_orders(Order.objects.filter(pk__in=[order.pk for order in orders]).order_by('pk'))
+        }, status=201)
+
+    except Exception as e:
+        logger.error("Bulk order error: %s", e, exc_info=True)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
@@ -519,20 +865,14 @@ def get_order(request, order_id: int) -> JsonResponse:
 def clear_orders(request) -> JsonResponse:
     """Clear all orders from the database"""
     try:
-        # Delete all orders (this will cascade delete order items)
-        count = Order.objects.count()
-        Order.objects.all().delete()
-        
-        # Broadcast empty orders list via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "orders",
-            {
-                "type": "orders_update",
-                "orders": []
-            }
+        # Short chunked transactions, so webhook inserts are not blocked meanwhile
+        count = bulk_delete.clear_orders(
+            progress=lambda total: logger.info("Cleared %s orders so far", total)
         )
         
+        # Broadcast the remaining orders via WebSocket, once
+        broadcast_order_update()
+        
         return JsonResponse({
             'status': 'success',
             'message': f'Successfully cleared {count} orders',
@@ -540,7 +880,7 @@ def clear_orders(request) -> JsonResponse:
         })
     
     except Exception as e:
-        logger.error(f"Clear orders error: {str(e)}")
+        logger.error("Clear orders error: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
@@ -555,14 +895,7 @@ def delete_order(request, order_id: int) -> JsonResponse:
         order.delete()
         
         # Broadcast updated orders list via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "orders",
-            {
-                "type": "orders_update",
-                "orders": async_to_sync(OrderConsumer().get_orders)()
-            }
-        )
+        broadcast_order_update()
         
         return JsonResponse({
             'status': 'success',
@@ -575,7 +908,7 @@ def delete_order(request, order_id: int) -> JsonResponse:
             'message': f'Order with id {order_id} not found'
         }, status=404)
     except Exception as e:
-        logger.error(f"Delete order error: {str(e)}")
+        logger.error("Delete order error: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
@@ -587,7 +920,7 @@ def vapi_remove_order_webhook(request):
     """Handle VAPI remove order webhook requests"""
     try:
         received = json.loads(request.body)
-        logger.info(f"Received remove order webhook request: {json.dumps(received, indent=2)}")
+        payload_logger.info("Received remove order webhook request: %s", LazyJson(received, indent=2))
         
         remove_tool_call = get_tool_call(received, 'removeorder')
         if not remove_tool_call:
@@ -598,7 +931,12 @@ def vapi_remove_order_webhook(request):
             )
             
         tool_call_id = remove_tool_call['id']
-        logger.info(f"Processing remove order tool call: {tool_call_id}")
+        logger.info("Processing remove order tool call: %s", tool_call_id)
+        # A retry must not remove a second matching order
+        response = tool_call_responses.get(tool_call_id)
+        if response is not None:
+            logger.info("Replaying result of tool call %s", tool_call_id)
+            return JsonResponse(response)
         
         # Get the order name from arguments
         function_args = remove_tool_call.get('function', {}).get('arguments', {})
@@ -607,7 +945,7 @@ def vapi_remove_order_webhook(request):
         
         order_data = function_args.get('Order', {})
         order_name = order_data.get('name', '').strip()
-        logger.info(f"Looking for order with name: {order_name}")
+        logger.info("Looking for order with name: %s", order_name)
         
         if not order_name:
             logger.warning("No order name provided")
@@ -616,37 +954,115 @@ def vapi_remove_order_webhook(request):
                 "Which order would you like to remove?"
             )
         
-        # Find most recent order matching the name
-        orders = Order.objects.filter(item_name__icontains=order_name).order_by('-created_at')
-        if not orders.exists():
-            logger.warning(f"No orders found with name: {order_name}")
+        # Find the caller's most recent active order matching the name; active_orders
+        # re-reads the caller's orders from the database when another worker placed them
+        call_id = get_call_id(received)
+        session = call_sessions.get(call_id)
+        customer_name = (function_args.get('customer_name') or '').strip()
+        if not customer_name and session is not None:
+            customer_name = session.customer_name
+        order = None
+        if call_id or customer_name:
+            order_id = active_orders.find(order_name, call_id=call_id, customer_name=customer_name)
+            if order_id is not None:
+                order = Order.objects.filter(pk=order_id).first()
+            if order_id is not None and order is None:
+                # Removed through another worker since this one indexed it
+                order_id = active_orders.find(order_name, call_id=call_id, customer_name=customer_name,
+                                              refresh=True)
+                if order_id is not None:
+                    order = Order.objects.filter(pk=order_id).first()
+        else:
+            # Caller unknown: fall back to matching any active order
+            order = (Order.objects.exclude(status__in=Order.TERMINAL_STATUSES)
+                     .filter(item_name__icontains=order_name)
+                     .order_by('-created_at')
+                     .first())
+        
+        if order is None:
+            logger.warning("No orders found with name: %s", order_name)
             return create_error_response(
                 tool_call_id,
                 f"I couldn't find any orders for '{order_name}'. Would you like to see your current orders?"
             )
         
-        order = orders.first()
         item_name = order.item_name
         order_id = order.id
-        logger.info(f"Found order #{order_id}: {item_name} x{order.quantity}")
+        logger.info("Found order #%s: %s x%s", order_id, item_name, order.quantity)
         
         order.delete()
-        logger.info(f"Successfully deleted order #{order_id}")
+        logger.info("Successfully deleted order #%s", order_id)
         
         broadcast_order_update()
         
-        return JsonResponse({
+        response = {
             "results": [{
                 "toolCallId": tool_call_id,
                 "result": f"I've removed order #{order_id} ({item_name}).",
                 "name": "order",
                 "order_id": str(order_id)
             }]
-        })
+        }
+        tool_call_responses.put(tool_call_id, response)
+        return JsonResponse(response)
             
     except Exception as e:
-        logger.error(f"Remove order webhook error: {str(e)}", exc_info=True)
+        logger.error("Remove order webhook error: %s", e, exc_info=True)
         return create_error_response(
             tool_call_id if 'tool_call_id' in locals() else "0dca5b3f-59c3-4236-9784-84e560fb26ef",
             "Sorry, I'm having trouble removing the order right now."
-        )
\ No newline at end of file
+        )
+
+def check_profiling_token(request) -> None:
+    """Profiles are only visible to callers holding the profiling token"""
+    token = settings.PROFILING_TOKEN
+    if not token or request.META.get('HTTP_X_PROFILE') != token:
+        raise Http404("Not found")
+
+@require_http_methods(["GET"])
+def list_profiles(request) -> JsonResponse:
+    """List stored request profiles, newest first"""
+    check_profiling_token(request)
+    directory = profile_dir()
+    profiles = sorted(directory.glob('*.prof'), key=lambda p: p.stat().st_mtime, reverse=True) if directory.exists() else []
+    return JsonResponse({
+        'status': 'success',
+        'profiles': [{
+            'name': p.name,
+            'size': p.stat().st_size
+        } for p in profiles]
+    })
+
+@require_http_methods(["GET"])
+def download_profile(request, name: str) -> FileResponse:
+    """Download a stored profile for use with pstats, snakeviz etc."""
+    check_profiling_token(request)
+    path = profile_dir() / name
+    if path.suffix != '.prof' or path.parent != profile_dir() or not path.is_file():
+        raise Http404("Profile not found")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+@require_http_methods(["GET"])
+def admission_metrics(request) -> JsonResponse:
+    """Admission control load, rejections and queue times per request class"""
+    return JsonResponse({
+        'status': 'success',
+        'admission': get_gate().snapshot()
+    })
+
+@require_http_methods(["GET"])
+def log_metrics(request) -> JsonResponse:
+    """Log records dropped because the async log queue was full"""
+    return JsonResponse({
+        'status': 'success',
+        'dropped_log_records': dropped_log_records()
+    })
+
+@require_http_methods(["GET"])
+def call_session_metrics(request) -> JsonResponse:
+    """Per-call session cache size and hit counts"""
+    return JsonResponse({
+        'status': 'success',
+        'call_sessions': call_sessions.stats(),
+        'tool_call_responses': tool_call_responses.stats()
+    })
@@ -18,6 +18,10 @@ from myapp.routing import websocket_urlpatterns
 # Initialize Django ASGI application early
 django_asgi_app = get_asgi_application()
 
+# Resume background menu embedding left over from a previous run
+from myapp import embedding_queue  # noqa: E402
+embedding_queue.start()
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
@@ -43,6 +43,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'myapp.middleware.WebhookCaptureMiddleware',
+    'myapp.middleware.AdmissionControlMiddleware',
+    'myapp.middleware.ProfilingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -76,6 +79,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers
+            # wait for each other instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file, so tests can write from several threads
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -91,12 +104,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 
 # Add this to the bottom of settings.py
+# Records are written by a background thread; LOG_FORMAT=plain for local reading
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Fraction of full webhook payload logs (logger myapp.payloads) that are kept
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'myapp.log.JsonFormatter',
+        },
+        'plain': {
+            'format': '%(levelname)s %(name)s: %(message)s',
+        },
+    },
+    'filters': {
+        'sample_payloads': {
+            '()': 'myapp.log.SamplingFilter',
+            'rates': {'myapp.payloads': LOG_PAYLOAD_SAMPLE_RATE},
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'myapp.log.AsyncLogHandler',
+            'formatter': LOG_FORMAT,
+            'filters': ['sample_payloads'],
         },
     },
     'root': {
@@ -109,14 +143,99 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        # Propagates to the root handler; a handler here too would write every record twice
         'myapp': {
-            'handlers': ['console'],
             'level': 'INFO',
-            'propagate': True,
         },
     },
 }
 
+# Menu search
+SEARCH_DEFAULT_TOP_K = int(os.getenv('SEARCH_DEFAULT_TOP_K', '5'))
+SEARCH_DEFAULT_MIN_SCORE = float(os.getenv('SEARCH_DEFAULT_MIN_SCORE', '0.7'))
+SEARCH_MAX_QUERIES = int(os.getenv('SEARCH_MAX_QUERIES', '50'))
+# Items still waiting for an embedding that are matched by words, newest first
+SEARCH_LEXICAL_MAX_ITEMS = int(os.getenv('SEARCH_LEXICAL_MAX_ITEMS', '500'))
+# Default embedding model; `python manage.py reembed_menu` switches the live one
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-ada-002')
+# Background embedding workers for menu writes
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '2'))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '50'))
+# Menu index compression: none, float16, int8 or pca (float16/int8 save memory but search slower)
+EMBEDDING_COMPRESSION = os.getenv('EMBEDDING_COMPRESSION', 'none')
+EMBEDDING_PCA_COMPONENTS = int(os.getenv('EMBEDDING_PCA_COMPONENTS', '256'))
+# Share the menu index between worker processes as memory-mapped .npy files
+MENU_INDEX_DIR = os.getenv('MENU_INDEX_DIR', '')
+MENU_INDEX_KEEP_VERSIONS = int(os.getenv('MENU_INDEX_KEEP_VERSIONS', '3'))
+MENU_INDEX_PUBLISH_DELAY = float(os.getenv('MENU_INDEX_PUBLISH_DELAY', '0.5'))
+# Streaming menu import: rows written per transaction, rejected rows listed individually
+MENU_IMPORT_CHUNK_SIZE = int(os.getenv('MENU_IMPORT_CHUNK_SIZE', '500'))
+MENU_IMPORT_MAX_REPORTED_ERRORS = int(os.getenv('MENU_IMPORT_MAX_REPORTED_ERRORS', '100'))
+
+# Per-call VAPI session cache
+CALL_SESSION_TTL = int(os.getenv('CALL_SESSION_TTL', '1800'))
+CALL_SESSION_MAX = int(os.getenv('CALL_SESSION_MAX', '1000'))
+# Responses replayed to VAPI retries of an already handled tool call
+TOOL_CALL_CACHE_TTL = int(os.getenv('TOOL_CALL_CACHE_TTL', '3600'))
+TOOL_CALL_CACHE_MAX = int(os.getenv('TOOL_CALL_CACHE_MAX', '5000'))
+# Encoded orders snapshots kept per process, one per distinct WebSocket filter
+ORDERS_SNAPSHOT_CACHE_MAX = int(os.getenv('ORDERS_SNAPSHOT_CACHE_MAX', '256'))
+# Orders accepted per orders/bulk/ request
+ORDER_BULK_MAX = int(os.getenv('ORDER_BULK_MAX', '500'))
+
+# Order archiving (run `python manage.py archive_orders` on a schedule)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '30'))
+ORDER_ARCHIVE_TERMINAL_AFTER_HOURS = int(os.getenv('ORDER_ARCHIVE_TERMINAL_AFTER_HOURS', '24'))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+# Rows per transaction when clearing orders or replacing the menu
+BULK_DELETE_BATCH_SIZE = int(os.getenv('BULK_DELETE_BATCH_SIZE', '1000'))
+
+# Admission control: webhooks holding a live caller are admitted first
+ADMISSION_CONTROL = {
+    'enabled': os.getenv('ADMISSION_CONTROL', 'True') == 'True',
+    'max_concurrent': int(os.getenv('ADMISSION_MAX_CONCURRENT', '8')),
+    'default_class': 'admin',
+    'classes': {
+        'webhook': {
+            'priority': 0,
+            'paths': ['/vapi/order/', '/vapi/remove/'],
+            'queue_size': 100,
+            'timeout': 10.0,
+            'max_active': None,
+        },
+        'lookup': {
+            'priority': 1,
+            'paths': ['/vapi/webhook/', '/menu/search/'],
+            'queue_size': 50,
+            'timeout': 5.0,
+            'max_active': 6,
+        },
+        'admin': {
+            'priority': 2,
+            'paths': [],
+            'queue_size': 20,
+            'timeout': 2.0,
+            'max_active': 3,
+        },
+    },
+}
+
+# Request profiling: send `X-Profile: <PROFILING_TOKEN>` or set a sample rate
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_PATH_PREFIXES = ['/vapi/']
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '50'))
+
+# Webhook capture for `replay_webhooks`: set a JSONL file to start recording
+WEBHOOK_CAPTURE_FILE = os.getenv('WEBHOOK_CAPTURE_FILE', '')
+WEBHOOK_CAPTURE_PATH_PREFIXES = ['/vapi/']
+WEBHOOK_CAPTURE_REDACT_KEYS = [
+    'customer', 'customerName', 'customer_name', 'special_instructions',
+    'phoneNumber', 'number', 'email',
+    'authorization', 'apiKey', 'secret', 'token',
+]
+
 # Add near the bottom with other settings
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://127.0.0.1:8000')  # Default to local for development
 
@@ -8,4 +8,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application()
+
+# Resume background menu embedding left over from a previous run
+from myapp import embedding_queue  # noqa: E402
+embedding_queue.start()
+ 
\ No newline at end of file